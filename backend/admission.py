@@ -0,0 +1,122 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+
+import metrics
+
+# Extractions run MAX_WORKERS at a time in the job pool (jobs.py); this
+# bounds what may wait behind them. Requests beyond the queue, or beyond
+# the per-client limit, are turned away with 429 before their body is read.
+MAX_QUEUED_UPLOADS = int(os.environ.get("UNICO_MAX_QUEUED_UPLOADS", "16"))
+MAX_UPLOADS_PER_CLIENT = int(os.environ.get("UNICO_MAX_UPLOADS_PER_CLIENT", "4"))
+
+# Header naming the client behind a reverse proxy (e.g. X-Forwarded-For);
+# the peer address is used when unset
+CLIENT_HEADER = os.environ.get("UNICO_CLIENT_HEADER", "")
+
+# Retry-After estimates come from the durations of the last requests
+RECENT_DURATIONS = 50
+DEFAULT_RETRY_AFTER_SECONDS = 5
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    def __init__(self, client):
+        self.client = client
+        self.admitted_at = time.perf_counter()
+        self.released = False
+
+
+class AdmissionController:
+    # Counts admitted upload requests, globally and per client, from
+    # admission until their work is done. Limits apply per API worker
+    # process. Thread-safe: job callbacks release tickets from the pool's
+    # result thread.
+
+    def __init__(self, max_active, max_queued=MAX_QUEUED_UPLOADS, per_client=MAX_UPLOADS_PER_CLIENT):
+        self.max_active = max(1, max_active)
+        self.max_queued = max(0, max_queued)
+        self.per_client = per_client
+        self.in_flight = 0
+        self.clients = {}
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "client_limit": 0}
+        self.durations = deque(maxlen=RECENT_DURATIONS)
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        return self.max_active + self.max_queued
+
+    def admit(self, client):
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                reason = "queue_full"
+            elif self.per_client > 0 and self.clients.get(client, 0) >= self.per_client:
+                reason = "client_limit"
+            else:
+                self.in_flight += 1
+                self.clients[client] = self.clients.get(client, 0) + 1
+                self.admitted += 1
+                return Ticket(client)
+            self.rejected[reason] += 1
+            retry_after = self._retry_after(reason)
+        metrics.admission_rejections.inc(reason=reason)
+        raise AdmissionRejected(reason, retry_after)
+
+    def release(self, ticket):
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            self.in_flight -= 1
+            remaining = self.clients[ticket.client] - 1
+            if remaining:
+                self.clients[ticket.client] = remaining
+            else:
+                del self.clients[ticket.client]
+            self.durations.append(time.perf_counter() - ticket.admitted_at)
+
+    def _retry_after(self, reason):
+        # Time for the work ahead to drain at the current pace: a client at
+        # its limit waits for one of its own requests, otherwise for the
+        # whole queue to move up by one
+        if not self.durations:
+            return DEFAULT_RETRY_AFTER_SECONDS
+        average = sum(self.durations) / len(self.durations)
+        if reason == "client_limit":
+            return max(1, math.ceil(average))
+        return max(1, math.ceil(average * (self.in_flight - self.max_active + 1) / self.max_active))
+
+    def stats(self):
+        with self._lock:
+            average = sum(self.durations) / len(self.durations) if self.durations else None
+            return {
+                "max_active": self.max_active,
+                "max_queued": self.max_queued,
+                "max_per_client": self.per_client,
+                "in_flight": self.in_flight,
+                "active": min(self.in_flight, self.max_active),
+                "queued": max(0, self.in_flight - self.max_active),
+                "clients": len(self.clients),
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "recent_request_seconds": round(average, 3) if average is not None else None,
+            }
+
+
+def client_key(request):
+    if CLIENT_HEADER:
+        value = request.headers.get(CLIENT_HEADER, "")
+        if value:
+            # X-Forwarded-For: the original client comes first
+            return value.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
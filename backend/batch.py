@@ -0,0 +1,128 @@
+import asyncio
+import os
+import time
+import zipfile
+
+from ingest import MAX_UPLOAD_BYTES, MB, UploadTooLarge, spool_stream
+from jobs import run_line_extraction, run_documents_write
+
+# Guard against archives that expand into an unreasonable number of PDFs
+MAX_BATCH_FILES = int(os.environ.get("UNICO_MAX_BATCH_FILES", "500"))
+
+# Upper bound on a whole /batch request body, and on the PDFs it expands
+# to once zip archives are decompressed
+MAX_BATCH_BYTES = int(os.environ.get("UNICO_MAX_BATCH_MB", "500")) * MB
+
+
+class BatchError(Exception):
+    pass
+
+
+def save_batch_uploads(files, upload_dir, max_bytes=MAX_BATCH_BYTES):
+    # Returns [(source_name, SpooledPdf)] for every PDF in the request,
+    # expanding .zip archives in place and keeping their member order.
+    # The caller cleans up the spooled PDFs once the batch is over.
+    sources = []
+    try:
+        for file in files:
+            _add_upload(file, upload_dir, sources, max_bytes)
+    except Exception:
+        for _, spooled in sources:
+            spooled.cleanup()
+        raise
+
+    if not sources:
+        raise BatchError("Không có file PDF nào")
+    return sources
+
+
+def _add_upload(file, upload_dir, sources, max_bytes):
+    name = file.filename or ""
+    lower_name = name.lower()
+    if lower_name.endswith(".pdf"):
+        sources.append((name, _spool(file.file, upload_dir, sources, max_bytes)))
+    elif lower_name.endswith(".zip"):
+        try:
+            with zipfile.ZipFile(file.file) as archive:
+                for member in archive.infolist():
+                    member_name = member.filename
+                    if member.is_dir() or not member_name.lower().endswith(".pdf"):
+                        continue
+                    if member_name.startswith("__MACOSX/"):
+                        continue
+                    with archive.open(member) as member_file:
+                        sources.append((f"{name}/{member_name}", _spool(member_file, upload_dir, sources, max_bytes)))
+                    _check_count(sources)
+        except zipfile.BadZipFile:
+            raise BatchError(f"File zip không hợp lệ: {name}")
+    else:
+        raise BatchError(f"Chỉ chấp nhận file PDF hoặc ZIP: {name}")
+    _check_count(sources)
+
+
+def _spool(stream, upload_dir, sources, max_bytes):
+    # Always on disk: every PDF of the batch stays alive until it is done.
+    # Decompressed zip members count against max_bytes together with the
+    # plain PDFs, so a small archive can't expand into gigabytes.
+    remaining = max_bytes - sum(spooled.size for _, spooled in sources)
+    try:
+        return spool_stream(stream, upload_dir, max_bytes=min(MAX_UPLOAD_BYTES, remaining), memory_limit=0)
+    except UploadTooLarge:
+        if remaining < MAX_UPLOAD_BYTES:
+            raise UploadTooLarge(f"Tổng dung lượng các file PDF vượt quá {max_bytes // MB} MB")
+        raise
+
+
+def _check_count(sources):
+    if len(sources) > MAX_BATCH_FILES:
+        raise BatchError(f"Tối đa {MAX_BATCH_FILES} file PDF mỗi lần")
+
+
+async def run_batch(jobs, sources, output_path, orders=None):
+    # Parse every PDF in parallel across the worker pool, then merge the
+    # successful ones (in upload order) into a single workbook. Parsed
+    # documents are also added to the order-line store when given.
+    started_at = time.time()
+    results = await asyncio.gather(
+        *(jobs.run(run_line_extraction, spooled.source) for _, spooled in sources),
+        return_exceptions=True,
+    )
+
+    documents = []
+    files_summary = []
+    for (source_name, spooled), result in zip(sources, results):
+        if isinstance(result, BaseException):
+            file_started, file_finished = getattr(result, "started_at", None), getattr(result, "finished_at", None)
+            files_summary.append({
+                "source_filename": source_name,
+                "status": "failed",
+                "items_count": 0,
+                "error": str(result),
+                # None when the PDF never reached a worker (e.g. the pool broke)
+                "duration_seconds": round(file_finished - file_started, 3) if file_started is not None else None,
+            })
+            continue
+
+        documents.append((result["header"], result["lines"]))
+        if orders is not None:
+            await asyncio.to_thread(orders.record_document, spooled.digest, source_name, result["header"], result["lines"])
+        files_summary.append({
+            "source_filename": source_name,
+            "status": "done",
+            "items_count": len(result["lines"]),
+            "mpo_no": result["header"]["mpo_no"],
+            "duration_seconds": round(result["finished_at"] - result["started_at"], 3),
+        })
+
+    items_count = 0
+    if documents:
+        written = await jobs.run(run_documents_write, documents, output_path, extraction=False)
+        items_count = written["items_count"]
+
+    return {
+        "items_count": items_count,
+        "files_count": len(sources),
+        "failed_count": len(sources) - len(documents),
+        "duration_seconds": round(time.time() - started_at, 3),
+        "files": files_summary,
+    }
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Extraction benchmark on synthetic and sample purchase orders
+
+Times each stage of UnicoExtractor.extract (open, header, tables, mapping,
+write), reports throughput and peak Python memory, and compares against a
+stored baseline so regressions fail the run.
+
+Usage:
+  python benchmark.py                          # default scenarios
+  python benchmark.py --pages 1,20,100 --lines-per-page 25 --repeat 5
+  python benchmark.py --save-baseline          # store results as the baseline
+  python benchmark.py --baseline bench_baseline.json --tolerance 0.25
+  python benchmark.py --layout-profiles        # cached column geometry
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from extractor import UnicoExtractor
+from layout import LayoutProfileStore
+from po_generator import generate_po
+
+STAGES = ["open", "header", "tables", "mapping", "write"]
+SAMPLES_GLOB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docs", "samples", "*.pdf")
+DEFAULT_BASELINE = "bench_baseline.json"
+
+
+def build_scenarios(args, work_dir):
+    scenarios = []
+    for pages in args.pages:
+        pdf_path = os.path.join(work_dir, f"synthetic_{pages}p.pdf")
+        po = generate_po(pdf_path, pages, args.lines_per_page, seed=pages)
+        scenarios.append({
+            "name": f"synthetic-{pages}p-{args.lines_per_page}l",
+            "pdf_path": pdf_path,
+            "expected_items": len(po["lines"]),
+        })
+    if args.samples:
+        for pdf_path in sorted(glob.glob(SAMPLES_GLOB)):
+            scenarios.append({
+                "name": f"sample-{os.path.basename(pdf_path)[:8]}",
+                "pdf_path": pdf_path,
+                "expected_items": None,
+            })
+    return scenarios
+
+
+def run_once(extractor, pdf_path, output_path):
+    stats = {}
+    started = time.perf_counter()
+    items = extractor.extract(pdf_path, output_path, stats)
+    stats["total"] = time.perf_counter() - started
+    stats["items"] = items
+    return stats
+
+
+def run_scenario(scenario, args, work_dir):
+    layouts = LayoutProfileStore("", enabled=args.layout_profiles)
+    extractor = UnicoExtractor(excel_writer=args.writer, layouts=layouts)
+    output_path = os.path.join(work_dir, "bench_output.xlsx")
+
+    # Untimed warm-up: imports, layout profile learning, OS caches
+    run_once(extractor, scenario["pdf_path"], output_path)
+
+    runs = [run_once(extractor, scenario["pdf_path"], output_path) for _ in range(args.repeat)]
+
+    tracemalloc.start()
+    run_once(extractor, scenario["pdf_path"], output_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = statistics.median(run["total"] for run in runs)
+    pages = runs[0]["pages"]
+    items = runs[0]["items"]
+    expected = scenario["expected_items"]
+    return {
+        "name": scenario["name"],
+        "pages": pages,
+        "items": items,
+        "correct": expected is None or items == expected,
+        "stages": {
+            stage: round(statistics.median(run["timings"].get(stage, 0.0) for run in runs), 4)
+            for stage in STAGES
+        },
+        "total_seconds": round(total, 4),
+        "pages_per_second": round(pages / total, 2) if total else None,
+        "lines_per_second": round(items / total, 2) if total else None,
+        "peak_memory_mb": round(peak / 1024 / 1024, 2),
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    regressions = []
+    baseline_by_name = {result["name"]: result for result in baseline.get("results", [])}
+    for result in results:
+        base = baseline_by_name.get(result["name"])
+        if base is None:
+            continue
+        for metric in ("total_seconds", "peak_memory_mb"):
+            if base[metric] and result[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{result['name']}: {metric} {result[metric]} > baseline {base[metric]} (+{tolerance:.0%})"
+                )
+    return regressions
+
+
+def print_report(results):
+    header = f"{'scenario':28} {'pages':>5} {'items':>6} " + " ".join(f"{stage:>8}" for stage in STAGES)
+    header += f" {'total':>8} {'pages/s':>8} {'lines/s':>8} {'peak MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        line = f"{result['name']:28} {result['pages']:>5} {result['items']:>6} "
+        line += " ".join(f"{result['stages'][stage]:>8.3f}" for stage in STAGES)
+        line += f" {result['total_seconds']:>8.3f} {result['pages_per_second']:>8} "
+        line += f"{result['lines_per_second']:>8} {result['peak_memory_mb']:>8}"
+        if not result["correct"]:
+            line += "  ❌ wrong item count"
+        print(line)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="1,10,50",
+                        type=lambda value: [int(pages) for pages in value.split(",")],
+                        help="comma-separated page counts of synthetic POs")
+    parser.add_argument("--lines-per-page", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per scenario (median is reported)")
+    parser.add_argument("--writer", default="auto", choices=["auto", "standard", "streaming"])
+    parser.add_argument("--no-samples", dest="samples", action="store_false", help="skip docs/samples PDFs")
+    parser.add_argument("--layout-profiles", action="store_true",
+                        help="reuse cached column geometry (UNICO_LAYOUT_PROFILES) instead of full table detection")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        scenarios = build_scenarios(args, work_dir)
+        results = []
+        for scenario in scenarios:
+            print(f"⏱  {scenario['name']} ...", file=sys.stderr)
+            results.append(run_scenario(scenario, args, work_dir))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "writer": args.writer,
+        "results": results,
+    }
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+        return
+
+    failed = [result["name"] for result in results if not result["correct"]]
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        if not regressions:
+            print(f"✅ No regressions against {args.baseline}")
+
+    for regression in regressions:
+        print(f"❌ {regression}")
+    for name in failed:
+        print(f"❌ {name}: extracted item count does not match the generated PO")
+    if regressions or failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+import time
+
+# Cached workbooks are evicted once they are older than this or once the
+# total size of cached workbooks goes over the byte budget (oldest use first)
+CACHE_ENABLED = os.environ.get("UNICO_CACHE_ENABLED", "1") == "1"
+CACHE_MAX_BYTES = int(os.environ.get("UNICO_CACHE_MAX_MB", "500")) * 1024 * 1024
+CACHE_MAX_AGE_SECONDS = float(os.environ.get("UNICO_CACHE_MAX_AGE_HOURS", "168")) * 3600
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    # Maps sha256(PDF bytes) + extractor version to a workbook already
+    # sitting in the output directory. Entries live in the shared registry
+    # (registry.py), so every API worker sees the same cache.
+
+    def __init__(self, output_dir, version, registry, max_bytes=CACHE_MAX_BYTES,
+                 max_age_seconds=CACHE_MAX_AGE_SECONDS, enabled=CACHE_ENABLED, on_evict=None):
+        self.output_dir = output_dir
+        self.version = version
+        self.registry = registry
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.enabled = enabled
+        # Called with the workbook file name whenever an eviction removes it
+        self.on_evict = on_evict
+        # Hit/miss counters are per worker process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def key(self, digest):
+        return f"{digest}:{self.version}"
+
+    def get(self, key):
+        # A plain read; the registry write lock is only taken to record the
+        # use of a hit, or to drop an entry whose workbook is gone or too
+        # old. Blocks on that lock: call it off the event loop.
+        if not self.enabled:
+            return None
+        db = self.registry.connection()
+        row = db.execute("SELECT * FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        entry = dict(row) if row is not None else None
+        if entry is not None and (self._expired(entry) or not self._exists(entry)):
+            self._evict_stale(key)
+            entry = None
+        if entry is not None:
+            entry["last_access"] = time.time()
+            db.execute("UPDATE cache_entries SET last_access = ? WHERE key = ?", (entry["last_access"], key))
+            # About to be served again: restart the janitor's grace period,
+            # as for a freshly written workbook
+            try:
+                os.utime(os.path.join(self.output_dir, entry["filename"]))
+            except OSError:
+                pass
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, key, output_path, items_count):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self.registry.transaction() as db:
+            # A concurrent upload of the same PDF already filled this entry
+            row = db.execute("SELECT * FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self._exists(row) and not self._expired(row):
+                return
+
+            db.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, filename, items_count, size, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, os.path.basename(output_path), items_count, os.path.getsize(output_path), now, now),
+            )
+            self._enforce_limits(db)
+
+    def stats(self):
+        db = self.registry.connection()
+        entries, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries").fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "max_age_seconds": self.max_age_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+            }
+
+    def _enforce_limits(self, db):
+        for row in db.execute(
+            "SELECT * FROM cache_entries WHERE created_at < ?", (time.time() - self.max_age_seconds,)
+        ).fetchall():
+            self._evict(db, row)
+
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for row in db.execute("SELECT * FROM cache_entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            total -= row["size"]
+            self._evict(db, row)
+
+    def _evict_stale(self, key):
+        with self.registry.transaction() as db:
+            # Another worker may have refilled the entry since it was read
+            row = db.execute("SELECT * FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and (self._expired(row) or not self._exists(row)):
+                self._evict(db, row)
+
+    def _evict(self, db, entry):
+        db.execute("DELETE FROM cache_entries WHERE key = ?", (entry["key"],))
+        with self._lock:
+            self.evictions += 1
+        try:
+            os.remove(os.path.join(self.output_dir, entry["filename"]))
+        except FileNotFoundError:
+            return
+        if self.on_evict is not None:
+            self.on_evict(entry["filename"])
+
+    def _expired(self, entry):
+        return time.time() - entry["created_at"] > self.max_age_seconds
+
+    def _exists(self, entry):
+        return os.path.exists(os.path.join(self.output_dir, entry["filename"]))
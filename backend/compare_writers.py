@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Check that the streaming Excel writer matches the standard one
+
+Usage: python compare_writers.py [rows] [pdf_path]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from extractor import UnicoExtractor
+from verify_outputs import compare_workbooks
+
+
+def sample_documents(rows):
+    header = {
+        "issued_date": "12/12/2025",
+        "ship_date": "13/12/2025",
+        "mpo_no": "HDM-UB-12-2025-0227",
+        "season": "F26BULK",
+        "buyer": "LL.BEAN",
+        "ship_to": "",
+        "location": "BẮC GIANG",
+    }
+    lines = [
+        {"style": f"58{i:05d}R", "qty": (i * 37) % 5000 + 1, "unit": "YDS"}
+        for i in range(rows)
+    ]
+    return [(header, lines)]
+
+
+def write_with(writer, documents, output_path):
+    extractor = UnicoExtractor(excel_writer=writer)
+    tracemalloc.start()
+    started = time.perf_counter()
+    extractor.write_documents(documents, output_path)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    if len(sys.argv) > 2:
+        print(f"📄 Source: {sys.argv[2]}")
+        header_info, lines = UnicoExtractor().extract_lines(sys.argv[2])
+        documents = [(header_info, lines)]
+    else:
+        documents = sample_documents(rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        standard_path = os.path.join(tmp_dir, "standard.xlsx")
+        streaming_path = os.path.join(tmp_dir, "streaming.xlsx")
+
+        standard_time, standard_peak = write_with("standard", documents, standard_path)
+        streaming_time, streaming_peak = write_with("streaming", documents, streaming_path)
+
+        print(f"Rows: {sum(len(lines) for _, lines in documents)}")
+        print(f"standard : {standard_time:.3f}s, peak {standard_peak / 1024 / 1024:.1f} MB")
+        print(f"streaming: {streaming_time:.3f}s, peak {streaming_peak / 1024 / 1024:.1f} MB")
+
+        diffs, _ = compare_workbooks(streaming_path, standard_path)
+
+    if diffs:
+        print("❌ Outputs differ:")
+        for diff in diffs:
+            print(f"  {diff}")
+        sys.exit(1)
+
+    print("✅ Streaming output matches the standard writer")
+
+
+if __name__ == "__main__":
+    main()
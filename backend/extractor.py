@@ -1,11 +1,183 @@
-import pdfplumber
-import openpyxl
+import io
 import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+import frames
+from layout import extract_page_table, layout_profiles, template_fingerprint
+
+# Bump whenever parsing or the 27-column mapping changes, so cached
+# results produced by an older version are not served again
+EXTRACTOR_VERSION = "1"
+
+# Header fields found in a single pass over the header text. Values are
+# captured in lookaheads so a long value (SEASON, BUYER run to the end of
+# the line) never hides a field or ship-to keyword that follows it.
+HEADER_FIELD_PATTERNS = [
+    ("issued_date", r"ISSUED DATE:", r"\d{1,2}\s+\w{3}\s+\d{4}"),
+    ("ship_date", r"Ship Date:", r"\d{1,2}\s+\w{3}\s+\d{4}"),
+    ("mpo_no", r"MPO-NO:", r"[A-Z0-9-]+"),
+    ("season", r"SEASON:", r"[^\n-]+"),
+    ("buyer", r"BUYER:", r"[^\n-]+"),
+]
+HEADER_LOCATION_PATTERNS = [
+    ("bac_giang", r"(?i:BAC NINH|UNICO GLOBAL VN)"),
+    ("yen_bai", r"(?i:LAO CAI|YEN BAI|UNICO GLOBAL YB)"),
+]
+HEADER_PATTERN = re.compile("|".join(
+    [f"(?P<{name}>{label}\\s*(?:(?=(?P<{name}_value>{value})))?)" for name, label, value in HEADER_FIELD_PATTERNS]
+    + [f"(?P<{name}>{keywords})" for name, keywords in HEADER_LOCATION_PATTERNS]
+))
+MPO_FALLBACK_PATTERN = re.compile(r"MPO-NO:\s*([^\n]+)")
+
+# The header region ends with the table header line starting at this word
+TABLE_HEADER_WORD = "IDCODE"
+
+# Documents with at least this many pages get their tables extracted
+# in worker processes, split into contiguous page ranges
+PARALLEL_PAGE_THRESHOLD = int(os.environ.get("UNICO_PARALLEL_PAGE_THRESHOLD", "40"))
+
+# Worker processes used for page-parallel extraction. Each job-pool worker
+# (UNICO_MAX_WORKERS, see jobs.py) gets its own page pool, so by default
+# they share the CPUs: with a full job pool there is no page parallelism
+# and no cpu² oversubscription.
+JOB_WORKERS = max(1, int(os.environ.get("UNICO_MAX_WORKERS", os.cpu_count() or 1)))
+PAGE_WORKERS = int(os.environ.get("UNICO_PAGE_WORKERS", max(1, (os.cpu_count() or 1) // JOB_WORKERS)))
+
+# Excel writer backend: "standard", "streaming" or "auto" (streaming once
+# the row count reaches STREAMING_WRITER_MIN_ROWS)
+EXCEL_WRITER = os.environ.get("UNICO_EXCEL_WRITER", "auto")
+STREAMING_WRITER_MIN_ROWS = int(os.environ.get("UNICO_STREAMING_WRITER_MIN_ROWS", "500"))
+
+# Low-memory mode for very large POs: pages are parsed serially and their
+# cached layout objects released right after each table is read, and rows
+# go straight to the write-only workbook instead of being collected first
+LOW_MEMORY = os.environ.get("UNICO_LOW_MEMORY", "0") == "1"
+
+# Resident memory ceiling per extraction, checked after every page (0
+# disables). It bounds the growth of the process's RSS since the
+# extraction started: pool workers are reused and keep what earlier jobs
+# left allocated. Exceeding it fails the extraction with
+# MemoryLimitExceeded instead of letting the container get OOM-killed.
+MEMORY_LIMIT_MB = int(os.environ.get("UNICO_MEMORY_LIMIT_MB", "0"))
+
+MB = 1024 * 1024
+
+# Page triage before table detection (see layout.page_may_have_rows):
+# "on" skips pages that cannot hold an order line, "off" detects tables on
+# every page, "strict" triages but still extracts skipped pages and
+# reports any order line found on them as a triage miss
+PAGE_TRIAGE = os.environ.get("UNICO_PAGE_TRIAGE", "on")
+
+
+class MemoryLimitExceeded(Exception):
+    pass
+
+
+def current_rss_bytes():
+    # Resident set size of this process (Linux /proc); None elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def open_pdf(source):
+    # source is a file path or the PDF bytes of an in-memory upload
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    # Imported on first use: pdfplumber/pdfminer are only needed where PDFs
+    # are parsed (worker processes), not by the API process at startup
+    import pdfplumber
+    return pdfplumber.open(source)
+
+
+@contextmanager
+def stage_timer(stats, stage):
+    # Adds the block's wall time to stats["timings"][stage]; no-op without stats
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = stats.setdefault("timings", {})
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+def _extract_page_range_tables(source, start, stop, profile, triage):
+    # Runs in a worker process: one extract_page_table() result per page, in page order
+    with open_pdf(source) as pdf:
+        return [
+            extract_page_table(page, profile, first_page=page_index == 0, triage=triage)
+            for page_index, page in enumerate(pdf.pages[start:stop], start)
+        ]
+
+
+class MappingPlan:
+    # The 27 output columns for one document. Everything that depends only
+    # on the header (dates, BILLTO/CONSIGNEE, PO, constants) is computed
+    # once by _map_to_27_columns; each line is kept as a compact
+    # (stt, style, unit, qty) record and expanded into a row on demand.
+    LINE_COLUMNS = (1, 14, 23, 26)  # STT, STYLE, ĐVT, SL GIAO TRÒN CÂY
+    PLACEHOLDER_LINE = {"style": None, "unit": None, "qty": None}
+
+    def __init__(self, template):
+        self.template = template
+
+    def record(self, line, stt):
+        return (stt, line["style"], line["unit"], line["qty"])
+
+    def expand(self, record):
+        row = self.template.copy()
+        row[1], row[14], row[23], row[26] = record
+        return row
+
+
+class MappedRows:
+    # Output rows of one or more documents as (plan, records) segments,
+    # in order. Iterating yields full 27-column rows; writers that can
+    # reuse the document-constant cells walk the segments instead.
 
-class UnicoExtractor:
     def __init__(self):
+        self.segments = []
+        self._count = 0
+
+    def add(self, plan, lines):
+        first_stt = self._count + 1
+        records = [plan.record(line, stt) for stt, line in enumerate(lines, first_stt)]
+        self.segments.append((plan, records))
+        self._count += len(records)
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for plan, records in self.segments:
+            expand = plan.expand
+            for record in records:
+                yield expand(record)
+
+
+class UnicoExtractor:
+    def __init__(self, parallel_page_threshold=PARALLEL_PAGE_THRESHOLD, page_workers=PAGE_WORKERS,
+                 excel_writer=EXCEL_WRITER, layouts=layout_profiles, low_memory=LOW_MEMORY,
+                 memory_limit_mb=MEMORY_LIMIT_MB, pandas_pipeline=None, page_triage=PAGE_TRIAGE):
+        self.parallel_page_threshold = parallel_page_threshold
+        self.page_workers = max(1, page_workers)
+        self.excel_writer = excel_writer
+        self.layouts = layouts
+        self.low_memory = low_memory
+        self.memory_limit_mb = memory_limit_mb
+        self.page_triage = page_triage
+        # Optional DataFrame validation and the STYLE/ĐVT summary sheet;
+        # falls back to the row-by-row path when pandas is not installed
+        self.pandas_pipeline = frames.pipeline_enabled() if pandas_pipeline is None else pandas_pipeline
+        
         # 27 columns matching sample Excel format
         self.columns = [
             "Ghi chú", "STT", "HĐ", "Tình trạng ĐH", "Ngày nhận đơn", 
@@ -20,38 +192,324 @@ class UnicoExtractor:
         
         # Column indices with smaller font size (8pt instead of 10pt)
         self.small_font_columns = [17, 18, 25]  # pkl, Mô tả, Khách đặt
-
-    def extract(self, pdf_path, output_xlsx_path):
-        data_rows = []
         
-        with pdfplumber.open(pdf_path) as pdf:
-            # 1. Extract Global Header Info (from first page usually)
-            first_page_text = pdf.pages[0].extract_text()
-            
-            header_info = self._parse_header(first_page_text)
-            
-            # 2. Extract Table Rows (iterate all pages)
-            stt_counter = 1
-            for page in pdf.pages:
-                table = page.extract_table()
-                if not table:
-                    continue
-                
-                for row in table:
+        # Column indices centered in data rows (0-indexed)
+        self.center_columns = [1, 4, 13, 23]  # STT, Ngày nhận đơn, TỈNH, ĐVT
+        
+        # Column widths from sample
+        self.column_widths = [
+            9.14, 9.14, 7.14, 10.43, 11.29,  # A-E
+            13.0, 13.0, 9.14, 15.43, 10.0,     # F-J
+            10.0, 10.0, 10.0, 10.0, 10.0,      # K-O
+            10.0, 10.0, 10.0, 10.0, 10.0,      # P-T
+            10.0, 10.0, 10.0, 10.0, 10.0,      # U-Z
+            10.0, 10.0                           # AA-AB
+        ]
+
+    def extract(self, source, output_xlsx_path, stats=None):
+        # stats, when given, is filled with per-stage timings and counts
+        header_info, lines = self.extract_lines(source, stats)
+        return self.write_documents([(header_info, lines)], output_xlsx_path, stats)
+
+    def extract_lines(self, source, stats=None):
+        header_info = None
+        lines = []
+        if self.pandas_pipeline:
+            # Every raw row of the document validated in one pass (frames.py)
+            raw_rows = []
+            for header_info, page_number, page_count, table in self.iter_tables(source, stats):
+                raw_rows.extend(table or [])
+            with stage_timer(stats, "rows"):
+                lines = frames.parse_rows(raw_rows)
+            return header_info, lines
+        for header_info, page_number, page_count, page_lines in self.iter_pages(source, stats):
+            lines.extend(page_lines)
+        return header_info, lines
+
+    def iter_pages(self, source, stats=None):
+        # Yields (header_info, page_number, page_count, lines) as each page
+        # is parsed, so callers can report progress or stream rows before
+        # the whole document is done. Time spent by the consumer between
+        # pages is not counted in the stage timings.
+        for header_info, page_number, page_count, table in self.iter_tables(source, stats):
+            with stage_timer(stats, "tables"):
+                page_lines = []
+                for row in table or []:
                     # Logic to identify if a row is a valid order line
                     # Usually by checking if there's a quantity and a style
                     parsed_line = self._parse_table_row(row)
                     if parsed_line:
-                        # Merge header info with line item info
-                        full_row = self._map_to_27_columns(header_info, parsed_line, stt_counter)
-                        data_rows.append(full_row)
-                        stt_counter += 1
+                        page_lines.append(parsed_line)
+            yield header_info, page_number, page_count, page_lines
+
+    def iter_tables(self, source, stats=None):
+        # Yields (header_info, page_number, page_count, raw table rows) per
+        # page; pages skipped by triage are listed in stats["skipped_pages"].
+        # When stats has a "page_timings" list (profiled runs), each page's
+        # table time is appended to it.
+        rss_at_start = current_rss_bytes()
+        with stage_timer(stats, "open"):
+            pdf = open_pdf(source)
+            page_count = len(pdf.pages)
+        if stats is not None:
+            stats["pages"] = stats.get("pages", 0) + page_count
+        
+        with pdf:
+            # 1. Extract Global Header Info (from first page usually)
+            with stage_timer(stats, "header"):
+                header_info, first_page_text = self._parse_header_page(pdf.pages[0])
+            
+            # 2. Extract Table Rows (iterate all pages)
+            # Known templates reuse cached column geometry instead of full
+            # table detection (see layout.py)
+            with stage_timer(stats, "tables"):
+                fingerprint = template_fingerprint(first_page_text, pdf.pages[0])
+                if self._use_parallel_pages(page_count):
+                    tables = self._extract_tables_parallel(source, page_count, fingerprint)
+                else:
+                    tables = self._extract_tables(pdf, fingerprint)
+            
+            # One table per page, pulled lazily
+            page_timings = stats.get("page_timings") if stats is not None else None
+            for page_number in range(1, page_count + 1):
+                if page_timings is not None:
+                    page_started = time.perf_counter()
+                with stage_timer(stats, "tables"):
+                    table, status = next(tables)
+                    if status == "skipped":
+                        table = self._record_skipped(stats, page_number, table)
+                if page_timings is not None:
+                    page_timings.append({
+                        "page": page_number,
+                        "seconds": round(time.perf_counter() - page_started, 4),
+                        "status": status,
+                        "table_rows": len(table or []),
+                    })
+                self._check_memory(stats, page_number, page_count, rss_at_start)
+                yield header_info, page_number, page_count, table
 
+    def extract_low_memory(self, source, output_xlsx_path, stats=None, on_page=None):
+        # Low-memory counterpart of extract(): each page's rows are mapped
+        # and appended to the write-only workbook before the next page is
+        # parsed. Only the parsed lines are kept (the order-line store needs
+        # them). on_page(header_info, page_number, page_count, page_lines,
+        # first_stt) is called for every page. Returns (header_info, lines).
+        wb, ws, data_cells = self._open_streaming_workbook()
+        header_info = None
+        lines = []
+        plan = None
+        try:
+            for header_info, page_number, page_count, page_lines in self.iter_pages(source, stats):
+                if plan is None:
+                    plan = self.compile_mapping(header_info)
+                    for cell, value in zip(data_cells, plan.template):
+                        cell.value = value
+                    line_cells = [data_cells[col_idx] for col_idx in MappingPlan.LINE_COLUMNS]
+                if on_page is not None:
+                    on_page(header_info, page_number, page_count, page_lines, len(lines) + 1)
+                with stage_timer(stats, "write"):
+                    for stt, line in enumerate(page_lines, len(lines) + 1):
+                        for cell, value in zip(line_cells, plan.record(line, stt)):
+                            cell.value = value
+                        ws.append(data_cells)
+                lines.extend(page_lines)
+        except BaseException:
+            # Nothing is saved; drop the sheet's temp file as well
+            if ws._writer is not None:
+                ws.close()
+                ws._writer.cleanup()
+            raise
+        
+        with stage_timer(stats, "write"):
+            if self.pandas_pipeline:
+                self._write_summary_sheet(wb, frames.summarize([(header_info, lines)]))
+            wb.save(output_xlsx_path)
+        if stats is not None:
+            stats["rows"] = stats.get("rows", 0) + len(lines)
+        return header_info, lines
+
+    def _check_memory(self, stats, page_number, page_count, rss_at_start):
+        if not self.memory_limit_mb and not self.low_memory:
+            return
+        rss = current_rss_bytes()
+        if rss is None or rss_at_start is None:
+            return
+        grown = max(0, rss - rss_at_start)
+        if stats is not None:
+            stats["peak_rss_mb"] = max(stats.get("peak_rss_mb", 0), round(rss / MB, 1))
+            stats["peak_rss_growth_mb"] = max(stats.get("peak_rss_growth_mb", 0), round(grown / MB, 1))
+        if self.memory_limit_mb and grown > self.memory_limit_mb * MB:
+            raise MemoryLimitExceeded(
+                f"Vượt giới hạn bộ nhớ {self.memory_limit_mb} MB (+{grown // MB} MB) "
+                f"tại trang {page_number}/{page_count}"
+            )
+
+    def _use_parallel_pages(self, page_count):
+        # Low-memory mode stays in this process so the ceiling covers it
+        return (
+            not self.low_memory
+            and self.page_workers > 1
+            and self.parallel_page_threshold > 0
+            and page_count >= self.parallel_page_threshold
+        )
+
+    def _extract_tables(self, pdf, fingerprint):
+        for page_index, page in enumerate(pdf.pages):
+            # Looked up per page: the first page may have just taught it
+            profile = self.layouts.get(fingerprint)
+            table, status, learned = extract_page_table(
+                page, profile, first_page=page_index == 0, triage=self.page_triage
+            )
+            self._record_layout(fingerprint, status, learned)
+            if self.low_memory:
+                self._release_page(pdf, page)
+            yield table, status
+
+    def _record_skipped(self, stats, page_number, table):
+        # In strict mode the skipped page was still extracted: a valid line
+        # on it is a triage miss, reported and kept in the output
+        if stats is not None:
+            stats.setdefault("skipped_pages", []).append(page_number)
+        if table and any(self._parse_table_row(row) for row in table):
+            if stats is not None:
+                stats.setdefault("triage_misses", []).append(page_number)
+            return table
+        return None
+
+    def _release_page(self, pdf, page):
+        # pdfplumber keeps every page's chars/words/layout once computed,
+        # and pdfminer keeps every object it resolved (decoded content
+        # streams included); neither is needed after the table is parsed
+        page.close()
+        cached_objects = getattr(pdf.doc, "_cached_objs", None)
+        if cached_objects is not None:
+            cached_objects.clear()
+
+    def _record_layout(self, fingerprint, status, learned):
+        self.layouts.record(status)
+        self.layouts.put(fingerprint, learned)
+
+    def _extract_tables_parallel(self, source, page_count, fingerprint):
+        # Contiguous page ranges, a couple per worker so a slow range
+        # doesn't leave the others idle. map() keeps results in page order,
+        # so STT numbering is identical to the serial path.
+        workers = min(self.page_workers, page_count)
+        chunk_size = max(1, -(-page_count // (workers * 2)))
+        ranges = [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+        
+        profile = self.layouts.get(fingerprint)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_extract_page_range_tables, source, start, stop, profile, self.page_triage)
+                for start, stop in ranges
+            ]
+            for future in futures:
+                for table, status, learned in future.result():
+                    self._record_layout(fingerprint, status, learned)
+                    yield table, status
+
+    def build_rows(self, documents):
+        # documents: list of (header_info, lines) in output order.
+        # STT runs continuously across documents, PO comes from each header.
+        rows = MappedRows()
+        for header_info, lines in documents:
+            rows.add(self.compile_mapping(header_info), lines)
+        return rows
+
+    def compile_mapping(self, header_info):
+        # _map_to_27_columns stays the single definition of the mapping:
+        # the per-line columns of the template are overwritten on expand
+        return MappingPlan(self._map_to_27_columns(header_info, MappingPlan.PLACEHOLDER_LINE, None))
+
+    def map_rows(self, header_info, lines, first_stt=1):
+        # Full rows for part of one document (e.g. a single page)
+        plan = self.compile_mapping(header_info)
+        return [plan.expand(plan.record(line, stt)) for stt, line in enumerate(lines, first_stt)]
+
+    def write_documents(self, documents, output_xlsx_path, stats=None):
+        with stage_timer(stats, "mapping"):
+            data_rows = self.build_rows(documents)
+        
+        summary = None
+        if self.pandas_pipeline:
+            with stage_timer(stats, "summary"):
+                summary = frames.summarize(documents)
+        
         # 3. Write to Excel
-        self._write_to_excel(data_rows, output_xlsx_path)
+        with stage_timer(stats, "write"):
+            if self._use_streaming_writer(len(data_rows)):
+                self._write_to_excel_streaming(data_rows, output_xlsx_path, summary)
+            else:
+                self._write_to_excel(data_rows, output_xlsx_path, summary)
+        
+        if stats is not None:
+            stats["rows"] = stats.get("rows", 0) + len(data_rows)
         return len(data_rows)
 
+    def _use_streaming_writer(self, row_count):
+        if self.excel_writer == "streaming":
+            return True
+        if self.excel_writer == "auto":
+            return row_count >= STREAMING_WRITER_MIN_ROWS
+        return False
+
+    def _parse_header_page(self, page):
+        # Fast path: only the region above the line-item table, one regex
+        # pass. The full page text is only produced when a field label or
+        # the ship-to location isn't in that region.
+        # Returns (header_info, text the header was parsed from)
+        region_text = self._header_region_text(page)
+        if region_text:
+            found = self._scan_header(region_text)
+            labels = [name for name, _, _ in HEADER_FIELD_PATTERNS]
+            if all(name in found for name in labels) and found["location"]:
+                return self._build_header(found, region_text), region_text
+        
+        text = page.extract_text()
+        return self._parse_header(text), text
+
+    def _header_region_text(self, page):
+        chars = page.chars
+        position = "".join(char["text"] for char in chars).find(TABLE_HEADER_WORD)
+        if position < 0:
+            return None
+        # Map the string offset back to its char: a char's text can be
+        # longer than one character ("(cid:12)" for glyphs without Unicode)
+        offset = 0
+        for char in chars:
+            offset += len(char["text"])
+            if offset > position:
+                break
+        # Down to (and including) the table header line
+        bottom = char["bottom"]
+        return page.crop((0, 0, page.width, min(page.height, bottom))).extract_text()
+
+    def _scan_header(self, text):
+        # {field: first value found or None} for every label present,
+        # plus "location" from the ship-to keywords
+        found = {}
+        locations = set()
+        for match in HEADER_PATTERN.finditer(text):
+            name = match.lastgroup
+            if name in ("bac_giang", "yen_bai"):
+                locations.add(name)
+            elif found.get(name) is None:
+                found[name] = match.group(f"{name}_value")
+        
+        # Ship to (for location mapping)
+        # Ship to: UNICO GLOBAL VN CO.,LTD ... BAC NINH
+        if "bac_giang" in locations:
+            found["location"] = "BẮC GIANG"
+        elif "yen_bai" in locations:
+            found["location"] = "YÊN BÁI"
+        else:
+            found["location"] = None
+        return found
+
     def _parse_header(self, text):
+        return self._build_header(self._scan_header(text), text)
+
+    def _build_header(self, found, text):
         info = {
             "issued_date": "",
             "ship_date": "",
@@ -61,18 +519,16 @@ class UnicoExtractor:
             "ship_to": ""
         }
         
-        # Regex for Issued Date: 12 Dec 2025
-        issued_match = re.search(r"ISSUED DATE:\s*(\d{1,2}\s+\w{3}\s+\d{4})", text)
-        if issued_match:
-            info["issued_date"] = self._format_date(issued_match.group(1))
+        # Issued Date: 12 Dec 2025
+        if found.get("issued_date"):
+            info["issued_date"] = self._format_date(found["issued_date"])
         else:
             # Default to issued date if not found
             info["issued_date"] = "12/12/2025"
             
         # Ship Date - this PDF may not have explicit ship date
-        ship_match = re.search(r"Ship Date:\s*(\d{1,2}\s+\w{3}\s+\d{4})", text)
-        if ship_match:
-            info["ship_date"] = self._format_date(ship_match.group(1))
+        if found.get("ship_date"):
+            info["ship_date"] = self._format_date(found["ship_date"])
         else:
             # Default: issued date + 1 day
             try:
@@ -83,34 +539,24 @@ class UnicoExtractor:
             
         # MPO No: HDM-UB-12-2025-0227
         # Need to capture full string including hyphens
-        mpo_match = re.search(r"MPO-NO:\s*([A-Z0-9-]+)", text)
-        if mpo_match:
-            info["mpo_no"] = mpo_match.group(1).strip()
+        if found.get("mpo_no"):
+            info["mpo_no"] = found["mpo_no"].strip()
         
         # Alternative regex if above fails
         if not info["mpo_no"]:
-            mpo_match = re.search(r"MPO-NO:\s*([^\n]+)", text)
+            mpo_match = MPO_FALLBACK_PATTERN.search(text)
             if mpo_match:
                 info["mpo_no"] = mpo_match.group(1).strip()
             
         # Season: F26BULK
-        season_match = re.search(r"SEASON:\s*([^\n-]+)", text)
-        if season_match:
-            info["season"] = season_match.group(1).strip()
+        if found.get("season"):
+            info["season"] = found["season"].strip()
 
         # Buyer: LL.BEAN
-        buyer_match = re.search(r"BUYER:\s*([^\n-]+)", text)
-        if buyer_match:
-            info["buyer"] = buyer_match.group(1).strip()
+        if found.get("buyer"):
+            info["buyer"] = found["buyer"].strip()
 
-        # Ship to (for location mapping)
-        # Ship to: UNICO GLOBAL VN CO.,LTD ... BAC NINH
-        if "BAC NINH" in text.upper() or "UNICO GLOBAL VN" in text.upper():
-            info["location"] = "BẮC GIANG"
-        elif "LAO CAI" in text.upper() or "YEN BAI" in text.upper() or "UNICO GLOBAL YB" in text.upper():
-            info["location"] = "YÊN BÁI"
-        else:
-            info["location"] = "BẮC GIANG" # Default
+        info["location"] = found["location"] or "BẮC GIANG" # Default
 
         return info
 
@@ -266,7 +712,8 @@ class UnicoExtractor:
         except:
             return date_str
 
-    def _write_to_excel(self, data, output_path):
+    def _write_to_excel(self, data, output_path, summary=None):
+        import openpyxl
         from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
         
         wb = openpyxl.Workbook()
@@ -296,16 +743,6 @@ class UnicoExtractor:
         # Red text font for specific columns
         red_font = Font(name='Aptos Narrow', size=11, bold=False, color='FFFF0000')
         
-        # Column widths from sample
-        column_widths = [
-            9.14, 9.14, 7.14, 10.43, 11.29,  # A-E
-            13.0, 13.0, 9.14, 15.43, 10.0,     # F-J
-            10.0, 10.0, 10.0, 10.0, 10.0,      # K-O
-            10.0, 10.0, 10.0, 10.0, 10.0,      # P-T
-            10.0, 10.0, 10.0, 10.0, 10.0,      # U-Z
-            10.0, 10.0                           # AA-AB
-        ]
-        
         # Write headers with formatting
         for col_idx, col_name in enumerate(self.columns, 1):
             cell = ws.cell(row=1, column=col_idx, value=col_name)
@@ -326,8 +763,8 @@ class UnicoExtractor:
                              bold=True, color='FFFF0000')
             
             # Set column width
-            if col_idx <= len(column_widths):
-                ws.column_dimensions[openpyxl.utils.get_column_letter(col_idx)].width = column_widths[col_idx - 1]
+            if col_idx <= len(self.column_widths):
+                ws.column_dimensions[openpyxl.utils.get_column_letter(col_idx)].width = self.column_widths[col_idx - 1]
             
         # Write data with formatting
         for row_idx, row_data in enumerate(data, 2):
@@ -341,15 +778,141 @@ class UnicoExtractor:
                 
                 # Apply center alignment for some columns
                 # Based on sample: STT (col 2), Ngày nhận đơn (col 5), TỈNH (col 14)
-                if col_idx in [2, 5, 14, 24]:  # STT, Ngày nhận đơn, TỈNH, ĐVT
+                if (col_idx - 1) in self.center_columns:  # STT, Ngày nhận đơn, TỈNH, ĐVT
                     cell.alignment = Alignment(horizontal='center')
                 
                 # Apply red text for specific columns in data rows
                 if (col_idx - 1) in self.red_text_columns:
                     cell.font = red_font
-                
+        
+        if summary is not None:
+            self._write_summary_sheet(wb, summary)
+        wb.save(output_path)
+
+    def _named_styles(self):
+        # Same formatting as _write_to_excel, registered once per workbook
+        # as named styles instead of being assigned cell by cell.
+        # Returns (styles, header style name per column, data style name per column)
+        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+        
+        thin_border = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
+        header_fill = PatternFill(start_color='FFC1F0C8', end_color='FFC1F0C8', fill_type='solid')
+        data_fill = PatternFill(start_color='FFFFFF', end_color='FFFFFF', fill_type='solid')
+        
+        styles = {}
+        header_names = []
+        data_names = []
+        for col_idx in range(len(self.columns)):
+            small = col_idx in self.small_font_columns
+            red = col_idx in self.red_text_columns
+            center = col_idx in self.center_columns
+            
+            header_name = "unico_header" + ("_small" if small else "") + ("_red" if red else "")
+            if header_name not in styles:
+                styles[header_name] = NamedStyle(
+                    name=header_name,
+                    font=Font(name='Times New Roman', size=8 if small else 10, bold=True,
+                              color='FFFF0000' if red else None),
+                    fill=header_fill,
+                    alignment=Alignment(horizontal='center', vertical='center'),
+                    border=thin_border
+                )
+            header_names.append(header_name)
+            
+            data_name = "unico_data" + ("_red" if red else "") + ("_center" if center else "")
+            if data_name not in styles:
+                styles[data_name] = NamedStyle(
+                    name=data_name,
+                    font=Font(name='Aptos Narrow', size=11, bold=False,
+                              color='FFFF0000' if red else None),
+                    fill=data_fill,
+                    alignment=Alignment(horizontal='center') if center else Alignment(),
+                    border=thin_border
+                )
+            data_names.append(data_name)
+        
+        return list(styles.values()), header_names, data_names
+
+    def _open_streaming_workbook(self):
+        # Write-only workbook with the header row already written. Returns
+        # (workbook, sheet, data cells): one styled cell per column, reused
+        # for every row since append() writes the row out immediately.
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+        
+        wb = openpyxl.Workbook(write_only=True)
+        styles, header_names, data_names = self._named_styles()
+        for style in styles:
+            wb.add_named_style(style)
+        
+        ws = wb.create_sheet("UNICO Orders")
+        for col_idx, width in enumerate(self.column_widths, 1):
+            ws.column_dimensions[openpyxl.utils.get_column_letter(col_idx)].width = width
+        
+        header_cells = []
+        for col_name, style_name in zip(self.columns, header_names):
+            cell = WriteOnlyCell(ws, value=col_name)
+            cell.style = style_name
+            header_cells.append(cell)
+        ws.append(header_cells)
+        
+        data_cells = []
+        for style_name in data_names:
+            cell = WriteOnlyCell(ws)
+            cell.style = style_name
+            data_cells.append(cell)
+        return wb, ws, data_cells
+
+    def _write_to_excel_streaming(self, data, output_path, summary=None):
+        # Write-only workbook: rows are serialized as they are appended, so
+        # memory stays flat with row count. data may be any iterable of rows.
+        wb, ws, data_cells = self._open_streaming_workbook()
+        
+        if isinstance(data, MappedRows):
+            # Document-constant cells are set once per document, then only
+            # the per-line cells change from row to row
+            line_cells = [data_cells[col_idx] for col_idx in MappingPlan.LINE_COLUMNS]
+            for plan, records in data.segments:
+                for cell, value in zip(data_cells, plan.template):
+                    cell.value = value
+                for record in records:
+                    for cell, value in zip(line_cells, record):
+                        cell.value = value
+                    ws.append(data_cells)
+        else:
+            for row_data in data:
+                for cell, value in zip(data_cells, row_data):
+                    cell.value = value
+                ws.append(data_cells)
+        
+        if summary is not None:
+            self._write_summary_sheet(wb, summary)
         wb.save(output_path)
 
+    def _write_summary_sheet(self, wb, summary):
+        # Per STYLE/ĐVT totals (frames.summarize) on a second sheet; works
+        # for both the standard and the write-only workbook
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        
+        ws = wb.create_sheet("Tổng hợp")
+        for col_idx, width in enumerate([16, 8, 10, 12, 10], 1):
+            ws.column_dimensions[openpyxl.utils.get_column_letter(col_idx)].width = width
+        header_cells = []
+        for name in frames.SUMMARY_COLUMNS:
+            cell = WriteOnlyCell(ws, value=name)
+            cell.font = Font(name='Times New Roman', size=10, bold=True)
+            header_cells.append(cell)
+        ws.append(header_cells)
+        for row in summary:
+            ws.append(row)
+
 if __name__ == "__main__":
     # Test logic
     pass
@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+
+# Unstyled output formats for clients that only need the 27 values per
+# row (ERP import). Every serializer takes the column names and rows from
+# UnicoExtractor.build_rows and yields encoded chunks for a streaming
+# response, so nothing is written to outputs/.
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Rows buffered before a chunk is yielded
+CHUNK_ROWS = 500
+
+
+def iter_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for index, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if index % CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson(columns, rows):
+    for row in rows:
+        yield (json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def iter_json(columns, rows):
+    # A single JSON array of row objects, written incrementally
+    yield b"["
+    separator = "\n"
+    for row in rows:
+        yield (separator + json.dumps(dict(zip(columns, row)), ensure_ascii=False)).encode("utf-8")
+        separator = ",\n"
+    yield b"\n]\n"
+
+
+# format -> (serializer, media type, file extension)
+OUTPUT_FORMATS = {
+    "csv": (iter_csv, "text/csv; charset=utf-8", "csv"),
+    "json": (iter_json, "application/json", "json"),
+    "ndjson": (iter_ndjson, "application/x-ndjson", "ndjson"),
+}
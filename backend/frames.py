@@ -0,0 +1,93 @@
+import importlib.util
+import os
+
+# Optional DataFrame pipeline (needs pandas): all raw table rows of a
+# document are validated in one vectorized pass instead of row by row,
+# and workbooks get a "Tổng hợp" sheet with per STYLE/ĐVT totals
+PANDAS_PIPELINE = os.environ.get("UNICO_PANDAS_PIPELINE", "0") == "1"
+
+# Raw table columns (see UnicoExtractor._parse_table_row)
+STYLE_COLUMN, QTY_COLUMN, UNIT_COLUMN = 7, 8, 9
+MIN_ROW_LENGTH = 10
+
+# Every QTY with at most this many digits fits in int64
+INT64_DIGITS = 18
+
+SUMMARY_ROW_STYLES = ["total", "grand total", "remark"]
+DEFAULT_UNIT = "YDS"
+
+SUMMARY_COLUMNS = ["STYLE", "ĐVT", "Số dòng", "Tổng SL", "Số PO"]
+
+
+def pandas_available():
+    return importlib.util.find_spec("pandas") is not None
+
+
+def pipeline_enabled():
+    return PANDAS_PIPELINE and pandas_available()
+
+
+def parse_rows(rows):
+    # Same result as _parse_table_row on each row: [{"style", "qty", "unit"}]
+    # for the valid order lines, in row order
+    import pandas as pd
+
+    frame = pd.DataFrame(
+        [row[STYLE_COLUMN:UNIT_COLUMN + 1] for row in rows if row and len(row) >= MIN_ROW_LENGTH],
+        columns=["style", "qty", "unit"],
+        dtype=object,
+    )
+    if frame.empty:
+        return []
+
+    # QTY: decimal digits once thousands separators are removed (what
+    # int() accepts), and above zero. Non-string cells become NaN in the
+    # .str accessor and drop out.
+    qty = frame["qty"].str.replace(",", "", regex=False).str.strip()
+    valid = qty.str.isdecimal().fillna(False).astype(bool) & qty.ne("")
+    qty = qty.where(valid, "0")
+    if (qty.str.lstrip("0").str.len() > INT64_DIGITS).any():
+        # Past int64: Python ints, as int() gives on the row-by-row path
+        qty = qty.map(int)
+    else:
+        qty = qty.astype("int64")
+    valid &= qty > 0
+
+    # STYLE: not empty and not a total/remark line
+    style = frame["style"].str.strip().fillna("")
+    valid &= style.ne("") & ~style.str.lower().isin(SUMMARY_ROW_STYLES)
+
+    # ĐVT: YDS when the cell is empty
+    unit = frame["unit"].where(frame["unit"].notna() & frame["unit"].ne(""), DEFAULT_UNIT).str.strip()
+    valid &= unit.notna()
+
+    # Plain lists back out: DataFrame.to_dict() costs more than all the
+    # validation above
+    return [
+        {"style": s, "qty": q, "unit": u}
+        for s, q, u in zip(style[valid].tolist(), qty[valid].tolist(), unit[valid].tolist())
+    ]
+
+
+def summarize(documents):
+    # documents: [(header_info, lines)]. Returns rows for SUMMARY_COLUMNS,
+    # sorted by STYLE then ĐVT
+    import pandas as pd
+
+    frame = pd.DataFrame(
+        [
+            (header_info.get("mpo_no"), line["style"], line["unit"], line["qty"])
+            for header_info, lines in documents
+            for line in lines
+        ],
+        columns=["mpo_no", "style", "unit", "qty"],
+    )
+    if frame.empty:
+        return []
+    totals = frame.groupby(["style", "unit"], sort=True).agg(
+        lines=("qty", "size"), qty=("qty", "sum"), orders=("mpo_no", "nunique")
+    )
+    return [
+        [style, unit, int(row.lines), int(row.qty), int(row.orders)]
+        for (style, unit), row in zip(totals.index, totals.itertuples(index=False))
+    ]
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import tempfile
+
+from starlette.exceptions import HTTPException
+
+MB = 1024 * 1024
+
+# Uploads above this size are rejected with 413
+MAX_UPLOAD_BYTES = int(os.environ.get("UNICO_MAX_UPLOAD_MB", "50")) * MB
+
+# Uploads up to this size stay in memory; larger ones spill to a temp file
+MEMORY_SPOOL_BYTES = int(os.environ.get("UNICO_MEMORY_SPOOL_MB", "8")) * MB
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class SpooledPdf:
+    # Collects a PDF chunk by chunk, hashing as it goes. source is what the
+    # extractor opens: the bytes themselves, or the path of the spill file.
+
+    def __init__(self, spool_dir, max_bytes=MAX_UPLOAD_BYTES, memory_limit=MEMORY_SPOOL_BYTES):
+        self.spool_dir = spool_dir
+        self.max_bytes = max_bytes
+        self.memory_limit = memory_limit
+        self.size = 0
+        self.temp_path = None
+        self._digest = hashlib.sha256()
+        self._buffer = bytearray()
+        self._data = None
+        self._temp_file = None
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            self.cleanup()
+            raise UploadTooLarge(f"File vượt quá dung lượng cho phép ({self.max_bytes // MB} MB)")
+
+        self._digest.update(chunk)
+        if self._temp_file is None and self.size <= self.memory_limit:
+            self._buffer += chunk
+            return
+
+        if self._temp_file is None:
+            fd, self.temp_path = tempfile.mkstemp(suffix=".pdf", dir=self.spool_dir)
+            self._temp_file = os.fdopen(fd, "wb")
+            self._temp_file.write(self._buffer)
+            self._buffer = bytearray()
+        self._temp_file.write(chunk)
+
+    def close(self):
+        if self._temp_file is not None:
+            self._temp_file.close()
+        else:
+            self._data = bytes(self._buffer)
+            self._buffer = bytearray()
+        return self
+
+    @property
+    def digest(self):
+        return self._digest.hexdigest()
+
+    @property
+    def source(self):
+        if self.temp_path is not None:
+            return self.temp_path
+        return self._data
+
+    def cleanup(self):
+        # Called once processing ends (or the upload is rejected)
+        if self._temp_file is not None:
+            self._temp_file.close()
+        self._buffer = bytearray()
+        self._data = None
+        if self.temp_path is not None:
+            try:
+                os.remove(self.temp_path)
+            except FileNotFoundError:
+                pass
+            self.temp_path = None
+
+
+async def spool_upload(upload, spool_dir, max_bytes=MAX_UPLOAD_BYTES):
+    spooled = SpooledPdf(spool_dir, max_bytes=max_bytes)
+    while True:
+        chunk = await upload.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        spooled.write(chunk)
+    return spooled.close()
+
+
+def spool_stream(stream, spool_dir, max_bytes=MAX_UPLOAD_BYTES, memory_limit=MEMORY_SPOOL_BYTES):
+    spooled = SpooledPdf(spool_dir, max_bytes=max_bytes, memory_limit=memory_limit)
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        spooled.write(chunk)
+    return spooled.close()
+
+
+class RequestBodyLimit:
+    # ASGI middleware capping the body of POST requests to the given paths
+    # as it is received. The multipart form is parsed into its own temp
+    # files before any handler runs, so this is the only place a body
+    # without Content-Length (or with a false one) can be stopped early.
+
+    def __init__(self, app, limits):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = self.limits.get(scope["path"])
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Re-raised by FastAPI's body parsing and answered as 413
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File vượt quá dung lượng cho phép ({limit // MB} MB)"
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
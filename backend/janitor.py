@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+import metrics
+
+HOUR = 3600
+MB = 1024 * 1024
+
+# How often the background sweep runs
+RETENTION_INTERVAL_SECONDS = float(os.environ.get("UNICO_RETENTION_INTERVAL_SECONDS", "300"))
+
+# Per-directory limits: files older than the TTL are removed, then the
+# oldest files go until the directory fits its byte quota (0 disables)
+UPLOADS_TTL_SECONDS = float(os.environ.get("UNICO_UPLOADS_TTL_HOURS", "24")) * HOUR
+UPLOADS_MAX_BYTES = int(os.environ.get("UNICO_UPLOADS_MAX_MB", "1024")) * MB
+OUTPUTS_TTL_SECONDS = float(os.environ.get("UNICO_OUTPUTS_TTL_HOURS", "168")) * HOUR
+OUTPUTS_MAX_BYTES = int(os.environ.get("UNICO_OUTPUTS_MAX_MB", "2048")) * MB
+
+# Files modified this recently are never removed: they may still be
+# being written by a worker process
+WRITE_GRACE_SECONDS = float(os.environ.get("UNICO_RETENTION_GRACE_SECONDS", "600"))
+
+
+class Janitor:
+    # Keeps uploads/ and outputs/ within their TTL and byte quota. Hidden
+    # files (the registry database) are left alone, as are files held
+    # with hold()/release() while a job or a download is using them. Holds
+    # and removals are kept in the shared registry, so they count across
+    # all API workers, and only one worker at a time sweeps.
+
+    def __init__(self, registry, grace_seconds=WRITE_GRACE_SECONDS):
+        self.registry = registry
+        self.grace_seconds = grace_seconds
+        self.policies = OrderedDict()
+        self.runs = 0
+        self.last_run_at = None
+        self.last_run_seconds = None
+        self.last_error = None
+        self.registry_rows_pruned = {}
+
+    def add_directory(self, directory, max_age_seconds, max_bytes):
+        self.policies[directory] = {
+            "max_age_seconds": max_age_seconds,
+            "max_bytes": max_bytes,
+            "files_removed": 0,
+            "bytes_reclaimed": 0,
+        }
+
+    def hold(self, path):
+        if path is not None:
+            self.registry.hold(path)
+
+    def release(self, path):
+        if path is not None:
+            self.registry.release(path)
+
+    def record_removed(self, filename):
+        # Also called by ResultCache when it evicts a workbook
+        self.registry.mark_removed(filename)
+
+    def was_removed(self, filename):
+        artifact = self.registry.artifact(filename)
+        return artifact is not None and artifact["removed_at"] is not None
+
+    def sweep(self):
+        started = time.perf_counter()
+        for directory, policy in self.policies.items():
+            self._sweep_directory(directory, policy)
+        # Registry rows outlive the files they describe; drop the old ones
+        for table, count in self.registry.prune().items():
+            self.registry_rows_pruned[table] = self.registry_rows_pruned.get(table, 0) + count
+        self.runs += 1
+        self.last_run_at = time.time()
+        self.last_run_seconds = round(time.perf_counter() - started, 3)
+
+    def _sweep_directory(self, directory, policy):
+        now = time.time()
+        files = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    files.append((stat.st_mtime, stat.st_size, entry.path, entry.name))
+        except FileNotFoundError:
+            return
+
+        # Oldest first for both the TTL pass and the quota pass
+        files.sort()
+        total = sum(size for _, size, _, _ in files)
+        for mtime, size, path, name in files:
+            expired = now - mtime > policy["max_age_seconds"]
+            over_quota = policy["max_bytes"] > 0 and total > policy["max_bytes"]
+            if not expired and not over_quota:
+                # Newer files are younger and the quota is met
+                break
+            if now - mtime < self.grace_seconds or self.registry.is_held(path):
+                continue
+            if self._remove(path, name, size, directory, policy):
+                total -= size
+
+    def _remove(self, path, name, size, directory, policy):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+        self.record_removed(name)
+        policy["files_removed"] += 1
+        policy["bytes_reclaimed"] += size
+        metrics.retention_files_removed.inc(directory=directory)
+        metrics.retention_bytes_reclaimed.inc(size, directory=directory)
+        return True
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "last_run_at": self.last_run_at,
+            "last_run_seconds": self.last_run_seconds,
+            "last_error": self.last_error,
+            "held_files": self.registry.held_count(),
+            "registry_rows_pruned": dict(self.registry_rows_pruned),
+            "directories": {
+                directory: dict(policy) for directory, policy in self.policies.items()
+            },
+        }
+
+    async def run_forever(self, interval_seconds=RETENTION_INTERVAL_SECONDS):
+        # Background task started from the app lifespan; the sweep itself
+        # runs in a thread so directory scans never block the event loop
+        while True:
+            try:
+                if self.registry.acquire_lease("retention", interval_seconds * 2):
+                    await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+            await asyncio.sleep(interval_seconds)
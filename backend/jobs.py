@@ -0,0 +1,501 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import metrics
+from profiling import ExtractionProfiler, profile_paths
+
+# Job states reported by GET /jobs/{id}
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Upper bound on concurrent extractions (one per worker process)
+MAX_WORKERS = int(os.environ.get("UNICO_MAX_WORKERS", os.cpu_count() or 1))
+
+# Finished jobs kept in memory before the oldest are forgotten
+MAX_FINISHED_JOBS = int(os.environ.get("UNICO_MAX_FINISHED_JOBS", "1000"))
+
+# Prime every worker process at startup so the first request doesn't pay
+# for imports and first-use setup
+WARMUP_ENABLED = os.environ.get("UNICO_WARMUP", "0") == "1"
+
+
+# Registry connections of this pool process, by database path
+_registries = {}
+
+
+def _mark_running(registry_path, job_id, started_at):
+    # From the pool process: the API worker only learns the job started
+    # when it finishes, and other API workers read the registry
+    from registry import Registry
+
+    registry = _registries.get(registry_path)
+    if registry is None:
+        registry = _registries[registry_path] = Registry(registry_path)
+    try:
+        registry.start_job(job_id, started_at)
+    except sqlite3.Error:
+        # Bookkeeping only; never fail the extraction over it
+        pass
+
+
+def run_extraction(source, output_path, profile=None, job=None):
+    # Runs inside a worker process, so keep the arguments picklable.
+    # source is a PDF path or the PDF bytes. profile, when given, is the
+    # (cProfile dump, JSON report) paths of a profiled run (profiling.py).
+    # job is (registry path, job id) to record the start in the registry.
+    from extractor import UnicoExtractor
+
+    started_at = time.time()
+    if job is not None:
+        _mark_running(*job, started_at)
+    stats = {}
+    extractor = UnicoExtractor()
+    profiler = None
+    if profile is not None:
+        # Pages stay in this process: page-parallel workers are invisible to cProfile
+        extractor.page_workers = 1
+        profiler = ExtractionProfiler(*profile)
+        profiler.start(stats)
+    try:
+        if extractor.low_memory:
+            header_info, lines = extractor.extract_low_memory(source, output_path, stats)
+        else:
+            header_info, lines = extractor.extract_lines(source, stats)
+            extractor.write_documents([(header_info, lines)], output_path, stats)
+    except Exception as e:
+        if profiler is not None:
+            profiler.stop(stats, error=f"{type(e).__name__}: {e}")
+        raise
+    if profiler is not None:
+        profiler.stop(stats)
+        # Kept in the report only
+        stats.pop("page_timings")
+    return {
+        "items_count": len(lines),
+        "started_at": started_at,
+        "finished_at": time.time(),
+        "stats": stats,
+        "output_bytes": os.path.getsize(output_path),
+        # For the order-line store; dropped once recorded
+        "header": header_info,
+        "lines": lines,
+    }
+
+
+def run_line_extraction(source):
+    # Parse one PDF without writing a workbook (used by batch extraction)
+    from extractor import UnicoExtractor
+
+    started_at = time.time()
+    stats = {}
+    try:
+        header_info, lines = UnicoExtractor().extract_lines(source, stats)
+    except Exception as e:
+        # Travels back with the exception: batch summaries time failed PDFs too
+        e.started_at, e.finished_at = started_at, time.time()
+        raise
+    return {
+        "header": header_info,
+        "lines": lines,
+        "started_at": started_at,
+        "finished_at": time.time(),
+        "stats": stats,
+    }
+
+
+def run_streaming_extraction(source, output_path, events):
+    # Like run_extraction, but puts ("start" | "page", payload) events on
+    # the events queue (a Manager queue) as pages are parsed
+    from extractor import UnicoExtractor
+
+    started_at = time.time()
+    stats = {}
+    extractor = UnicoExtractor()
+
+    def on_page(header_info, page_number, page_count, page_lines, first_stt):
+        if page_number == 1:
+            events.put(("start", {"pages": page_count, "columns": extractor.columns, "header": header_info}))
+        events.put(("page", {
+            "page": page_number,
+            "pages": page_count,
+            "rows": extractor.map_rows(header_info, page_lines, first_stt),
+        }))
+
+    if extractor.low_memory:
+        header_info, lines = extractor.extract_low_memory(source, output_path, stats, on_page)
+    else:
+        header_info = None
+        lines = []
+        for header_info, page_number, page_count, page_lines in extractor.iter_pages(source, stats):
+            on_page(header_info, page_number, page_count, page_lines, len(lines) + 1)
+            lines.extend(page_lines)
+        extractor.write_documents([(header_info, lines)], output_path, stats)
+    return {
+        "items_count": len(lines),
+        "started_at": started_at,
+        "finished_at": time.time(),
+        "stats": stats,
+        "output_bytes": os.path.getsize(output_path),
+        "header": header_info,
+        "lines": lines,
+    }
+
+
+def run_documents_write(documents, output_path):
+    # Merge already-parsed documents into one workbook
+    from extractor import UnicoExtractor
+
+    started_at = time.time()
+    stats = {}
+    items_count = UnicoExtractor().write_documents(documents, output_path, stats)
+    return {
+        "items_count": items_count,
+        "started_at": started_at,
+        "finished_at": time.time(),
+        "stats": stats,
+        "output_bytes": os.path.getsize(output_path),
+    }
+
+
+def run_warmup():
+    # Imports pdfplumber/openpyxl in this worker and runs a small synthetic
+    # PO through extraction and both writers. A throwaway layout store keeps
+    # the synthetic template out of the worker's learned profiles.
+    import tempfile
+    from extractor import UnicoExtractor
+    from layout import LayoutProfileStore
+    from po_generator import generate_po
+
+    started_at = time.time()
+    with tempfile.TemporaryDirectory() as work_dir:
+        pdf_path = os.path.join(work_dir, "warmup.pdf")
+        generate_po(pdf_path, pages=1, lines_per_page=5)
+        for writer in ("standard", "streaming"):
+            extractor = UnicoExtractor(excel_writer=writer, layouts=LayoutProfileStore(""))
+            extractor.extract(pdf_path, os.path.join(work_dir, f"warmup_{writer}.xlsx"))
+    return {"pid": os.getpid(), "seconds": round(time.time() - started_at, 3)}
+
+
+def _observe_result(result, extraction=True):
+    # Worker results carry the stats filled in by UnicoExtractor
+    if extraction:
+        metrics.extractions.inc(result="done")
+    metrics.observe_stats(result.get("stats", {}))
+    metrics.bytes_out.inc(result.get("output_bytes", 0))
+
+
+class Job:
+    def __init__(self, job_id, source_name, output_path, future, created_at, cached=False, cleanup=None):
+        self.id = job_id
+        self.source_name = source_name
+        self.output_path = output_path
+        self.future = future
+        self.created_at = created_at
+        self.cached = cached
+        self.cleanup = cleanup
+        self.finished_at = None
+        self.future.add_done_callback(self._on_done)
+
+    def _on_done(self, future):
+        self.finished_at = time.time()
+        # Processing is over: release the spooled upload
+        if self.cleanup is not None:
+            self.cleanup()
+            self.cleanup = None
+
+    @property
+    def status(self):
+        if self.future.done():
+            if self.future.cancelled() or self.future.exception() is not None:
+                return JOB_FAILED
+            return JOB_DONE
+        if self.future.running():
+            return JOB_RUNNING
+        return JOB_QUEUED
+
+    @property
+    def result(self):
+        if self.status != JOB_DONE:
+            return None
+        return self.future.result()
+
+    @property
+    def error(self):
+        if self.status != JOB_FAILED:
+            return None
+        if self.future.cancelled():
+            return "Job bị hủy"
+        return str(self.future.exception())
+
+    def to_dict(self):
+        status = self.status
+        info = {
+            "job_id": self.id,
+            "status": status,
+            "source_filename": self.source_name,
+            "cached": self.cached,
+            "created_at": self.created_at,
+            "started_at": None,
+            "finished_at": self.finished_at,
+            "queue_seconds": None,
+            "run_seconds": None,
+        }
+
+        if status == JOB_DONE:
+            result = self.result
+            info["started_at"] = result["started_at"]
+            info["finished_at"] = result["finished_at"]
+            info["queue_seconds"] = round(max(0.0, result["started_at"] - self.created_at), 3)
+            info["run_seconds"] = round(result["finished_at"] - result["started_at"], 3)
+            info["items_count"] = result["items_count"]
+            info["filename"] = os.path.basename(self.output_path)
+            info["skipped_pages"] = result["stats"].get("skipped_pages", [])
+        elif status == JOB_FAILED:
+            info["error"] = self.error
+        else:
+            info["elapsed_seconds"] = round(time.time() - self.created_at, 3)
+
+        return info
+
+
+def registry_job_dict(record):
+    # Job.to_dict() shape for a job known only from the registry (it was
+    # submitted to another API worker). The pool process marks it
+    # "running" when it starts.
+    info = {
+        "job_id": record["id"],
+        "status": record["status"],
+        "source_filename": record["source_filename"],
+        "cached": record["cached"],
+        "created_at": record["created_at"],
+        "started_at": record["started_at"],
+        "finished_at": record["finished_at"],
+        "queue_seconds": None,
+        "run_seconds": None,
+        "worker": record["worker"],
+    }
+    if record["status"] == JOB_DONE:
+        info["queue_seconds"] = round(max(0.0, record["started_at"] - record["created_at"]), 3)
+        info["run_seconds"] = round(record["finished_at"] - record["started_at"], 3)
+        info["items_count"] = record["items_count"]
+        info["filename"] = record["output_filename"]
+        info["skipped_pages"] = record["stats"].get("skipped_pages", [])
+    elif record["status"] == JOB_FAILED:
+        info["error"] = record["error"]
+    else:
+        if record["status"] == JOB_RUNNING:
+            info["queue_seconds"] = round(max(0.0, record["started_at"] - record["created_at"]), 3)
+        info["elapsed_seconds"] = round(time.time() - record["created_at"], 3)
+    return info
+
+
+class JobManager:
+    def __init__(self, max_workers=MAX_WORKERS, max_finished_jobs=MAX_FINISHED_JOBS, cache=None, registry=None,
+                 orders=None):
+        self.max_workers = max(1, max_workers)
+        self.max_finished_jobs = max_finished_jobs
+        self.cache = cache
+        # Shared registry (registry.py): lets other API workers answer for
+        # jobs and files this one produced
+        self.registry = registry
+        # Order-line store (orders.py) every extracted document is added to
+        self.orders = orders
+        self._executor = None
+        self._manager = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Workers are started lazily so importing this module stays cheap
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def submit(self, source, output_path, source_name=None, cache_key=None, cleanup=None,
+               source_hash=None, source_bytes=None, profile_dir=None):
+        # profile_dir: run the extraction under the profiler and leave
+        # <job_id>.prof and <job_id>.json there (never served from the cache)
+        job_id = str(uuid.uuid4())
+        created_at = time.time()
+        
+        # Same PDF already extracted by this extractor version: finish the
+        # job immediately with the cached workbook
+        use_cache = self.cache and cache_key and profile_dir is None
+        entry = self.cache.get(cache_key) if use_cache else None
+        if entry is not None:
+            cached_path = os.path.join(os.path.dirname(output_path), entry["filename"])
+            if not self._hold_cached(cached_path):
+                entry = None
+        if entry is not None:
+            future = Future()
+            future.set_result({
+                "items_count": entry["items_count"],
+                "started_at": created_at,
+                "finished_at": created_at,
+                "stats": {},
+            })
+            metrics.extractions.inc(result="cached")
+            output_path = cached_path
+            if self.registry is not None:
+                self.registry.record_job(job_id, source_name, source_hash, source_bytes, output_path,
+                                         created_at, cached=True)
+                self.registry.finish_job(job_id, JOB_DONE, future.result())
+            job = Job(job_id, source_name, output_path, future, created_at, cached=True,
+                      cleanup=self._release_cached(cached_path, cleanup))
+            with self._lock:
+                self._jobs[job_id] = job
+                self._prune()
+            return job
+        
+        if self.registry is not None:
+            self.registry.record_job(job_id, source_name, source_hash, source_bytes, output_path, created_at)
+        
+        with self._lock:
+            profile = profile_paths(profile_dir, job_id) if profile_dir is not None else None
+            job_ref = (self.registry.path, job_id) if self.registry is not None else None
+            future = self._get_executor().submit(run_extraction, source, output_path, profile, job_ref)
+            job = Job(job_id, source_name, output_path, future, created_at, cleanup=cleanup)
+            self._jobs[job_id] = job
+            self._prune()
+        
+        future.add_done_callback(lambda f: self._on_finished(job, cache_key, source_hash))
+        return job
+
+    def _hold_cached(self, path):
+        # A cache hit serves a workbook the job didn't write: that one is
+        # held, not output_path, until the job's cleanup. Checked again once
+        # held, as the janitor may have removed it since the lookup.
+        if self.registry is None:
+            return True
+        self.registry.hold(path)
+        if os.path.exists(path):
+            return True
+        self.registry.release(path)
+        return False
+
+    def _release_cached(self, path, cleanup):
+        if self.registry is None:
+            return cleanup
+
+        def release():
+            try:
+                if cleanup is not None:
+                    cleanup()
+            finally:
+                self.registry.release(path)
+        return release
+
+    def _on_finished(self, job, cache_key, source_hash):
+        if job.status != JOB_DONE:
+            if not job.future.cancelled():
+                metrics.observe_error(job.future.exception())
+            if self.registry is not None:
+                self.registry.finish_job(job.id, JOB_FAILED, error=job.error, finished_at=job.finished_at)
+            return
+        result = job.result
+        _observe_result(result)
+        if self.orders is not None and source_hash:
+            # The workbook is already written; a store failure must not
+            # fail the job
+            try:
+                self.orders.record_document(source_hash, job.source_name, result["header"], result["lines"])
+            except Exception as e:
+                metrics.observe_error(e)
+        # Finished jobs stay in memory; the parsed lines are not needed there
+        result.pop("header", None)
+        result.pop("lines", None)
+        if self.registry is not None:
+            self.registry.finish_job(job.id, JOB_DONE, result)
+            self.registry.record_artifact(job.output_path, job.id, source_hash)
+        if self.cache and cache_key:
+            self.cache.put(cache_key, job.output_path, result["items_count"])
+
+    async def run(self, fn, *args, extraction=True):
+        # Run a worker function in the pool and await its result.
+        # extraction=False for work on documents parsed by an earlier run
+        # (merging a batch, exports), so each PDF counts once in
+        # extractions_total.
+        with self._lock:
+            future = self._get_executor().submit(fn, *args)
+        try:
+            result = await asyncio.wrap_future(future)
+        except Exception as e:
+            if extraction:
+                metrics.observe_error(e)
+            else:
+                metrics.errors.inc(type=type(e).__name__)
+            raise
+        _observe_result(result, extraction)
+        return result
+
+    async def stream(self, fn, *args, poll_seconds=0.2):
+        # Run fn(*args, events) in the pool and yield each event it puts on
+        # the queue, then ("result", worker result). Worker errors are
+        # raised after the events sent before the failure.
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.Manager()
+            events = self._manager.Queue()
+            future = self._get_executor().submit(fn, *args, events)
+        
+        while True:
+            try:
+                event = await asyncio.to_thread(events.get, True, poll_seconds)
+            except queue.Empty:
+                # The worker puts every event before it returns
+                if future.done():
+                    break
+                continue
+            yield event
+        
+        try:
+            result = future.result()
+        except Exception as e:
+            metrics.observe_error(e)
+            raise
+        _observe_result(result)
+        yield "result", result
+
+    async def warm_up(self):
+        # One warm-up task per worker. The pool starts processes as tasks
+        # arrive, so submitting them together normally spreads them over
+        # every worker; this is best effort, not a guarantee.
+        with self._lock:
+            executor = self._get_executor()
+            futures = [executor.submit(run_warmup) for _ in range(self.max_workers)]
+        return await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    async def wait(self, job):
+        # Await the worker without blocking the event loop
+        try:
+            await asyncio.wrap_future(job.future)
+        except Exception:
+            pass
+        return job
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.future.done()]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
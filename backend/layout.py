@@ -0,0 +1,205 @@
+import json
+import os
+import re
+import threading
+
+# Optional JSON file to keep learned layouts across restarts; by default
+# profiles live in memory for the lifetime of the (worker) process
+LAYOUT_PROFILES_PATH = os.environ.get("UNICO_LAYOUT_PROFILES_PATH", "")
+
+# Cached column geometry is off by default: it showed no reliable win over
+# plain find_table(). 29 warm synthetic pages took 2.46s vs 2.01s, and
+# benchmark.py on a 30-page PO gave 6.47s vs 6.93s in "tables", which is
+# within noise; the samples were the same. The crop still runs line
+# detection, and cell text assignment dominates either way. Compare with
+# benchmark.py --layout-profiles before enabling it for a template.
+LAYOUT_PROFILES_ENABLED = os.environ.get("UNICO_LAYOUT_PROFILES", "0") == "1"
+
+# How far (pt) a ruling line may sit from a cached column boundary
+LINE_TOLERANCE = 1.5
+
+# Page triage: an order line has at least this many cells (see
+# UnicoExtractor._parse_table_row), so its table needs one more vertical
+# ruling; rulings closer than pdfplumber's default snap tolerance count once
+MIN_TABLE_COLUMNS = 10
+SNAP_TOLERANCE = 3
+
+BUYER_PATTERN = re.compile(r"BUYER:\s*([^\n-]+)")
+TABLE_HEADER_PATTERN = re.compile(r"^.*\bIDCODE\b.*$", re.MULTILINE)
+
+
+def template_fingerprint(first_page_text, page):
+    # BUYER value + the table header line (IDCODE ARTICLE ... AMOUNT) + page
+    # size identify a supplier PO template. None when the page doesn't look
+    # like one, in which case profiles are not used at all.
+    if not first_page_text:
+        return None
+    header_match = TABLE_HEADER_PATTERN.search(first_page_text)
+    if not header_match:
+        return None
+    buyer_match = BUYER_PATTERN.search(first_page_text)
+    buyer = buyer_match.group(1).strip() if buyer_match else ""
+    header = " ".join(header_match.group(0).split())
+    return f"{buyer}|{header}|{round(page.width)}x{round(page.height)}"
+
+
+def learn_profile(table, rows):
+    # Column x-boundaries and header row of a table found by full detection
+    if not rows:
+        return None
+    columns = sorted({round(x, 3) for cell in table.cells for x in (cell[0], cell[2])})
+    if len(columns) - 1 != len(rows[0]):
+        return None
+    return {"columns": columns, "header": rows[0]}
+
+
+def page_may_have_rows(page):
+    # Cheap pre-check before table detection, from objects the page has
+    # parsed anyway: a QTY needs a digit, and a table with enough columns
+    # needs enough distinct vertical rulings (and two horizontal ones).
+    # Cover, terms and remark pages fail it.
+    if not any(char["text"].isdigit() for char in page.chars):
+        return False
+    edges = page.edges
+    vertical = _distinct_positions(edge["x0"] for edge in edges if edge["orientation"] == "v")
+    if vertical < MIN_TABLE_COLUMNS + 1:
+        return False
+    return _distinct_positions(edge["top"] for edge in edges if edge["orientation"] == "h") >= 2
+
+
+def _distinct_positions(values):
+    count = 0
+    last = None
+    for value in sorted(values):
+        if last is None or value - last > SNAP_TOLERANCE:
+            count += 1
+        last = value
+    return count
+
+
+def extract_page_table(page, profile=None, first_page=False, triage="off"):
+    # Returns (rows, status, learned):
+    #   status "profile"  - rows came from the cached geometry
+    #   status "fallback" - cached geometry failed validation, full detection ran
+    #   status "detected" - no profile, full detection ran
+    #   status "skipped"  - triage found no table worth detecting; rows is
+    #                       None, except with triage "strict" where full
+    #                       detection still runs so callers can check it
+    # learned is a fresh profile when full detection ran on the first page
+    if triage != "off" and not page_may_have_rows(page):
+        if triage != "strict":
+            return None, "skipped", None
+        table = page.find_table()
+        return (table.extract() if table is not None else None), "skipped", None
+
+    if profile is not None:
+        rows = _extract_with_profile(page, profile, first_page)
+        if rows is not None:
+            return rows, "profile", None
+
+    status = "fallback" if profile is not None else "detected"
+    table = page.find_table()
+    if table is None:
+        return None, status, None
+
+    rows = table.extract()
+    learned = learn_profile(table, rows) if first_page else None
+    return rows, status, learned
+
+
+def _extract_with_profile(page, profile, first_page):
+    columns = profile["columns"]
+
+    # Every cached boundary must still be backed by a vertical ruling line;
+    # the table region is where the inner column rulings run
+    span = _ruled_span(page, columns)
+    if span is None:
+        return None
+    top, bottom = span
+
+    region = page.crop((
+        max(0, columns[0] - LINE_TOLERANCE),
+        max(0, top - LINE_TOLERANCE),
+        min(page.width, columns[-1] + LINE_TOLERANCE),
+        min(page.height, bottom + LINE_TOLERANCE),
+    ))
+    rows = region.extract_table({
+        "vertical_strategy": "explicit",
+        "explicit_vertical_lines": columns,
+        "horizontal_strategy": "lines",
+    })
+    if not rows:
+        return None
+    if first_page and rows[0] != profile["header"]:
+        return None
+    return rows
+
+
+def _ruled_span(page, columns):
+    edges = page.vertical_edges
+    top = None
+    bottom = None
+    for index, x in enumerate(columns):
+        matching = [edge for edge in edges if abs(edge["x0"] - x) <= LINE_TOLERANCE]
+        if not matching:
+            return None
+        if 0 < index < len(columns) - 1:
+            edge_top = min(edge["top"] for edge in matching)
+            edge_bottom = max(edge["bottom"] for edge in matching)
+            top = edge_top if top is None else min(top, edge_top)
+            bottom = edge_bottom if bottom is None else max(bottom, edge_bottom)
+    if top is None:
+        return None
+    return top, bottom
+
+
+class LayoutProfileStore:
+    def __init__(self, path=LAYOUT_PROFILES_PATH, enabled=LAYOUT_PROFILES_ENABLED):
+        self.path = path
+        # Disabled: nothing is learned and every page gets full detection
+        self.enabled = enabled
+        self.counts = {"profile": 0, "fallback": 0, "detected": 0, "skipped": 0, "learned": 0}
+        self._lock = threading.Lock()
+        self._profiles = self._load()
+
+    def get(self, fingerprint):
+        if fingerprint is None or not self.enabled:
+            return None
+        with self._lock:
+            return self._profiles.get(fingerprint)
+
+    def put(self, fingerprint, profile):
+        if fingerprint is None or profile is None or not self.enabled:
+            return
+        with self._lock:
+            if self._profiles.get(fingerprint) == profile:
+                return
+            self._profiles[fingerprint] = profile
+            self.counts["learned"] += 1
+            self._save()
+
+    def record(self, status):
+        with self._lock:
+            self.counts[status] += 1
+
+    def _load(self):
+        if not self.path or not self.enabled:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self):
+        if not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._profiles, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+
+# Shared by every extractor in the process, so with UNICO_LAYOUT_PROFILES=1
+# a worker that has seen a template once reuses its geometry from then on
+layout_profiles = LayoutProfileStore()
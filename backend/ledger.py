@@ -0,0 +1,379 @@
+import io
+import json
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+import metrics
+from extractor import UnicoExtractor
+
+# Master-ledger mode: every extracted document is also appended to a
+# rolling workbook for its issue month (ledger/UNICO_ledger_YYYY-MM.xlsx)
+LEDGER_ENABLED = os.environ.get("UNICO_LEDGER_ENABLED", "0") == "1"
+LEDGER_DIR = os.environ.get("UNICO_LEDGER_DIR", "ledger")
+
+# Sidecar index, in the registry database: per month the row count and
+# the zip layout of the workbook, per MPO-NO the lines already in a ledger.
+# Appends never open a ledger with openpyxl.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ledgers (
+    month TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    layout TEXT NOT NULL,
+    updated_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS ledger_keys (
+    mpo_no TEXT NOT NULL,
+    line_key TEXT NOT NULL,
+    month TEXT NOT NULL,
+    stt INTEGER,
+    source_hash TEXT,
+    PRIMARY KEY (mpo_no, line_key)
+);
+CREATE INDEX IF NOT EXISTS ledger_keys_month ON ledger_keys (month);
+"""
+
+SHEET_PART = "xl/worksheets/sheet1.xml"
+
+# Same characters openpyxl refuses to write
+ILLEGAL_CHARACTERS = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+END_OF_CENTRAL_DIRECTORY = struct.Struct("<IHHHHIIH")
+
+
+class LedgerError(Exception):
+    pass
+
+
+def ledger_month(header):
+    # Ledgers are sharded by the month of the ISSUED DATE
+    try:
+        return datetime.strptime(header.get("issued_date") or "", "%d/%m/%Y").strftime("%Y-%m")
+    except ValueError:
+        return datetime.now().strftime("%Y-%m")
+
+
+def line_keys(lines):
+    # A line is identified within its MPO-NO by its values plus how many
+    # identical lines came before it, so a revised PO only adds what is new
+    seen = {}
+    keys = []
+    for line in lines:
+        values = f"{line['style']}|{line['unit']}|{line['qty']}"
+        seen[values] = seen.get(values, 0) + 1
+        keys.append(f"{values}|{seen[values]}")
+    return keys
+
+
+def _column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _deflate(data, mode):
+    # Raw deflate. Z_FULL_FLUSH ends on a byte boundary without the final
+    # block bit, so later appends can continue the same stream.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(mode)
+
+
+def _dos_timestamp(timestamp):
+    t = time.localtime(timestamp)
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), \
+        ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+class Ledger:
+    # The worksheet is the last entry of the zip and its deflate stream is
+    # kept open-ended: [head + rows (flushed blocks)][tail (final block)]
+    # [central directory]. Appending writes the new rows over the tail,
+    # then a fresh tail, the patched sizes/CRC and the central directory,
+    # so the cost depends on the new rows only, not on the ledger size.
+    # Appends are serialized across API workers by the registry write lock.
+    # Documents recorded through the OrderStore hook are appended by one
+    # background thread, in the order they arrive.
+
+    def __init__(self, registry, directory=LEDGER_DIR, extractor=None):
+        self.registry = registry
+        self.directory = directory
+        self.extractor = extractor or UnicoExtractor()
+        self.appended_rows = 0
+        self.skipped_rows = 0
+        self.last_error = None
+        self.pending_appends = 0
+        self._template = None
+        self._appender = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        registry.connection().executescript(SCHEMA)
+
+    def path(self, month):
+        return os.path.join(self.directory, f"UNICO_ledger_{month}.xlsx")
+
+    def record_document(self, source_hash, source_name, header, lines):
+        # OrderStore hook. The append (deflate, fsync, registry write lock)
+        # is queued, so no upload waits for it; a ledger failure never
+        # fails the extraction
+        with self._lock:
+            if self._appender is None:
+                # Started on first use: pool workers forked earlier never get it
+                self._appender = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ledger")
+            self.pending_appends += 1
+        self._appender.submit(self._append_queued, source_hash, header, lines)
+
+    def _append_queued(self, source_hash, header, lines):
+        try:
+            self.append(source_hash, header, lines)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            metrics.observe_error(e)
+        finally:
+            with self._lock:
+                self.pending_appends -= 1
+
+    def close(self):
+        # Waits for the queued appends (server shutdown)
+        with self._lock:
+            appender, self._appender = self._appender, None
+        if appender is not None:
+            appender.shutdown(wait=True)
+
+    def append(self, source_hash, header, lines):
+        # Returns the number of rows added to the month's ledger
+        month = ledger_month(header)
+        mpo_no = header.get("mpo_no") or ""
+        path = self.path(month)
+        with self.registry.transaction() as db:
+            known = {
+                row[0] for row in db.execute("SELECT line_key FROM ledger_keys WHERE mpo_no = ?", (mpo_no,))
+            }
+            new_lines = [(key, line) for key, line in zip(line_keys(lines), lines) if key not in known]
+            with self._lock:
+                self.skipped_rows += len(lines) - len(new_lines)
+            if not new_lines:
+                return 0
+
+            plan = self.extractor.compile_mapping(header)
+            styles = self._get_template()["styles"]
+            state = db.execute("SELECT row_count, layout FROM ledgers WHERE month = ?", (month,)).fetchone()
+            created = not os.path.exists(path)
+            if created:
+                # First document of the month (or the file was deleted):
+                # start a new ledger and forget what the old one held
+                db.execute("DELETE FROM ledger_keys WHERE month = ?", (month,))
+                row_count, layout = 0, self._create(path)
+            elif state is None:
+                # A ledger the index knows nothing about (registry reset or
+                # another UNICO_LEDGER_DIR): its layout and line keys are
+                # gone, so it is never appended to, nor overwritten
+                raise LedgerError(
+                    f"Sổ tổng {path} không có trong registry; "
+                    "hãy chuyển file này sang chỗ khác để bắt đầu sổ mới cho tháng"
+                )
+            else:
+                row_count, layout = state["row_count"], json.loads(state["layout"])
+
+            first_stt = row_count + 1
+            rows_xml = "".join(
+                self._row_xml(stt + 1, plan.expand(plan.record(line, stt)), styles)
+                for stt, (_, line) in enumerate(new_lines, first_stt)
+            )
+            previous = dict(layout)
+            try:
+                self._append_rows(path, layout, rows_xml.encode("utf-8"))
+                db.execute(
+                    "INSERT OR REPLACE INTO ledgers (month, filename, row_count, layout, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (month, os.path.basename(path), row_count + len(new_lines), json.dumps(layout), time.time()),
+                )
+                db.executemany(
+                    "INSERT INTO ledger_keys (mpo_no, line_key, month, stt, source_hash) VALUES (?, ?, ?, ?, ?)",
+                    [(mpo_no, key, month, stt, source_hash) for stt, (key, _) in enumerate(new_lines, first_stt)],
+                )
+            except BaseException:
+                # The index rolls back with the transaction; so must the
+                # file. A ledger started by this append goes altogether, or
+                # the next one would find a file the index doesn't know.
+                if created:
+                    os.remove(path)
+                else:
+                    self._restore_end(path, previous)
+                raise
+        with self._lock:
+            self.appended_rows += len(new_lines)
+        return len(new_lines)
+
+    def months(self):
+        rows = self.registry.connection().execute(
+            "SELECT month, filename, row_count, updated_at FROM ledgers ORDER BY month"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def snapshot(self, month, target_path):
+        # Copy taken under the registry write lock, so a download never
+        # sees a ledger halfway through an append
+        with self.registry.transaction():
+            path = self.path(month)
+            if not os.path.exists(path):
+                return False
+            shutil.copyfile(path, target_path)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": True,
+                "directory": self.directory,
+                "months": len(self.months()),
+                "appended_rows": self.appended_rows,
+                "skipped_rows": self.skipped_rows,
+                "pending_appends": self.pending_appends,
+                "last_error": self.last_error,
+            }
+
+    # Workbook layout
+
+    def _get_template(self):
+        # The streaming writer's output for one placeholder row gives the
+        # package parts, the worksheet head/tail around the rows and the
+        # style index of each data column
+        if self._template is None:
+            buffer = io.BytesIO()
+            self.extractor._write_to_excel_streaming([[1] * len(self.extractor.columns)], buffer)
+            with zipfile.ZipFile(buffer) as package:
+                parts = [(name, package.read(name)) for name in package.namelist() if name != SHEET_PART]
+                sheet = package.read(SHEET_PART).decode("utf-8")
+            row_start = sheet.index('<row r="2"')
+            row_end = sheet.index("</row>", row_start) + len("</row>")
+            self._template = {
+                "parts": parts,
+                "head": sheet[:row_start].encode("utf-8"),
+                "tail": sheet[row_end:].encode("utf-8"),
+                "styles": re.findall(r'<c r="[A-Z]+2" s="(\d+)"', sheet[row_start:row_end]),
+            }
+        return self._template
+
+    def _row_xml(self, row_number, row, styles):
+        cells = []
+        for col_idx, (style, value) in enumerate(zip(styles, row)):
+            ref = f"{_column_letter(col_idx)}{row_number}"
+            if value is None or value == "":
+                cells.append(f'<c r="{ref}" s="{style}"/>')
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                cells.append(f'<c r="{ref}" s="{style}" t="n"><v>{value}</v></c>')
+            else:
+                text = escape(ILLEGAL_CHARACTERS.sub("", str(value)))
+                cells.append(f'<c r="{ref}" s="{style}" t="inlineStr"><is><t>{text}</t></is></c>')
+        return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+    def _create(self, path):
+        try:
+            return self._write_new(path)
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+
+    def _write_new(self, path):
+        template = self._get_template()
+        dos_time, dos_date = _dos_timestamp(time.time())
+        entries = []
+        with open(path, "wb") as f:
+            for name, data in template["parts"]:
+                compressed = _deflate(data, zlib.Z_FINISH)
+                entries.append([name, f.tell(), zlib.crc32(data), len(compressed), len(data)])
+                f.write(LOCAL_HEADER.pack(0x04034B50, 20, 0, 8, dos_time, dos_date, entries[-1][2],
+                                          len(compressed), len(data), len(name), 0))
+                f.write(name.encode("utf-8"))
+                f.write(compressed)
+
+            sheet_offset = f.tell()
+            f.write(LOCAL_HEADER.pack(0x04034B50, 20, 0, 8, dos_time, dos_date, 0, 0, 0, len(SHEET_PART), 0))
+            f.write(SHEET_PART.encode("utf-8"))
+            data_offset = f.tell()
+            f.write(_deflate(template["head"], zlib.Z_FULL_FLUSH))
+            layout = {
+                "entries": entries,
+                "sheet_offset": sheet_offset,
+                "data_offset": data_offset,
+                # End of the flushed rows, where the final tail block starts
+                "body_end": f.tell(),
+                "body_crc": zlib.crc32(template["head"]),
+                "body_size": len(template["head"]),
+                "tail": template["tail"].decode("utf-8"),
+                "dos_time": dos_time,
+                "dos_date": dos_date,
+            }
+            self._write_end(f, layout)
+        return layout
+
+    def _append_rows(self, path, layout, rows_xml):
+        # The new rows overwrite the old tail and central directory, so
+        # until _write_end completes the file is not a valid zip. On any
+        # failure the previous end is written back and layout is unchanged.
+        previous = dict(layout)
+        with open(path, "r+b") as f:
+            try:
+                f.seek(layout["body_end"])
+                f.write(_deflate(rows_xml, zlib.Z_FULL_FLUSH))
+                layout["body_end"] = f.tell()
+                layout["body_crc"] = zlib.crc32(rows_xml, layout["body_crc"])
+                layout["body_size"] += len(rows_xml)
+                self._write_end(f, layout)
+            except BaseException:
+                layout.update(previous)
+                self._write_end(f, layout)
+                raise
+            finally:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _restore_end(self, path, layout):
+        # Back to the ledger as it was before an append: the old tail and
+        # central directory, truncated after them
+        with open(path, "r+b") as f:
+            self._write_end(f, layout)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_end(self, f, layout):
+        # Final tail block, sheet sizes/CRC in its local header, central
+        # directory. Also restores the previous end after a failed append;
+        # should that fail too (the process died), the index still points
+        # at the previous body_end and the next append overwrites the rest.
+        tail = layout["tail"].encode("utf-8")
+        f.seek(layout["body_end"])
+        f.write(_deflate(tail, zlib.Z_FINISH))
+        end = f.tell()
+        sheet_entry = [
+            SHEET_PART, layout["sheet_offset"], zlib.crc32(tail, layout["body_crc"]),
+            end - layout["data_offset"], layout["body_size"] + len(tail),
+        ]
+        f.seek(layout["sheet_offset"] + 14)
+        f.write(struct.pack("<III", *sheet_entry[2:]))
+
+        f.seek(end)
+        for name, offset, crc, compressed_size, size in layout["entries"] + [sheet_entry]:
+            f.write(CENTRAL_HEADER.pack(0x02014B50, 20, 20, 0, 8, layout["dos_time"], layout["dos_date"],
+                                        crc, compressed_size, size, len(name), 0, 0, 0, 0, 0, offset))
+            f.write(name.encode("utf-8"))
+        directory_size = f.tell() - end
+        count = len(layout["entries"]) + 1
+        f.write(END_OF_CENTRAL_DIRECTORY.pack(0x06054B50, 0, 0, count, count, directory_size, end, 0))
+        f.truncate()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Check the master ledger's in-place zip appends
+
+Appends synthetic documents to a ledger in a temporary directory and,
+after every append, checks the workbook with zipfile.testzip() (CRCs and
+sizes of every part). Every --check-every appends, and at the end, it is
+also loaded with openpyxl: the row count must match the ledger index and
+STT must run 1..N. With --inject-failures, that share of appends fails
+while the new end is written; the ledger must then still be valid and
+unchanged. Exits 1 on the first problem.
+
+Usage:
+  python ledger_check.py
+  python ledger_check.py --appends 200 --check-every 20
+  python ledger_check.py --inject-failures 0.3 --json ledger_check.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+
+import openpyxl
+
+from ledger import Ledger
+from po_generator import make_po
+from registry import Registry
+
+
+class InjectedFailure(OSError):
+    pass
+
+
+def document(index, rng):
+    po = make_po(pages=1, lines_per_page=rng.randint(1, 28), seed=index)
+    header = {
+        "issued_date": "12/12/2025",
+        "ship_date": "13/12/2025",
+        "mpo_no": f"{po['mpo_no']}-{index}",
+        "season": po["season"],
+        "buyer": po["buyer"],
+        "ship_to": "",
+        "location": "BẮC GIANG",
+    }
+    lines = [{"style": line["style"], "qty": line["qty"], "unit": line["unit"]} for line in po["lines"]]
+    return header, lines
+
+
+def fail_next_write_end(ledger):
+    # The next _write_end raises after the new rows were written over the
+    # old end; the restore that follows goes through the real method
+    state = {"hit": False}
+
+    def failing(f, layout):
+        del ledger._write_end
+        state["hit"] = True
+        raise InjectedFailure("injected failure in _write_end")
+    ledger._write_end = failing
+    return state
+
+
+def check_zip(path):
+    try:
+        with zipfile.ZipFile(path) as package:
+            bad = package.testzip()
+    except zipfile.BadZipFile as e:
+        return f"not a valid zip: {e}"
+    return None if bad is None else f"bad CRC or size in {bad}"
+
+
+def check_rows(path, expected_rows):
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        stts = [row[0] for row in wb.active.iter_rows(min_row=2, min_col=2, max_col=2, values_only=True)]
+    finally:
+        wb.close()
+    if len(stts) != expected_rows:
+        return f"{len(stts)} rows, index says {expected_rows}"
+    if stts != list(range(1, expected_rows + 1)):
+        return "STT is not continuous"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--appends", type=int, default=50, help="documents appended")
+    parser.add_argument("--check-every", type=int, default=10, help="openpyxl check every N appends")
+    parser.add_argument("--inject-failures", type=float, default=0.0, help="share of appends made to fail")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    problems = []
+    appended = failed = 0
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="unico-ledger-") as work_dir:
+        registry = Registry(os.path.join(work_dir, "registry.sqlite3"))
+        ledger = Ledger(registry, os.path.join(work_dir, "ledger"))
+        path = None
+        for index in range(1, args.appends + 1):
+            header, lines = document(index, rng)
+            # Never the first append: there is no earlier ledger to keep
+            inject = index > 1 and rng.random() < args.inject_failures
+            injected = fail_next_write_end(ledger) if inject else None
+            try:
+                appended += ledger.append(f"doc-{index}", header, lines)
+            except InjectedFailure:
+                failed += 1
+            if injected is not None and not injected["hit"]:
+                ledger.__dict__.pop("_write_end", None)
+                problems.append(f"append {index}: injected failure was not hit")
+
+            month = ledger.months()[0]
+            path = ledger.path(month["month"])
+            problem = check_zip(path)
+            if problem is None and (inject or index % args.check_every == 0 or index == args.appends):
+                problem = check_rows(path, month["row_count"])
+            if problem is not None:
+                problems.append(f"append {index}{' (failed)' if inject else ''}: {problem}")
+                break
+        size = os.path.getsize(path) if path else 0
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "appends": args.appends,
+                "failed_appends": failed,
+                "rows": appended,
+                "ledger_bytes": size,
+                "seconds": round(elapsed, 3),
+                "problems": problems,
+            }, f, indent=2, ensure_ascii=False)
+
+    summary = f"{args.appends} appends ({failed} failed on purpose), {appended} rows, {size // 1024} KB"
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print(f"✅ Ledger valid after {summary} ⏱ {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
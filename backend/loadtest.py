@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""Concurrent load test for the API
+
+Fires concurrent POST /upload calls (and, with --download-ratio, GET
+/download of earlier results) at the service. The service is either
+started in this process on a free local port or reached at --url. A ramp
+profile steps the concurrency over time. Each stage reports throughput,
+p50/p95/p99 latency and error rate, plus the CPU and RSS of the server
+process and its extraction workers. Requests turned away by admission
+control (429) are counted apart, outside throughput and latency, and the
+simulated user waits out Retry-After before its next request.
+
+Every upload gets a unique trailing PDF comment so the result cache
+doesn't turn the run into a cache benchmark (--allow-cache to keep the
+bytes identical).
+
+Each simulated user sends its own client id in --client-header, so the
+server's per-client upload cap (UNICO_MAX_UPLOADS_PER_CLIENT) applies per
+user rather than to the single load-generator address. The in-process
+server is started with UNICO_CLIENT_HEADER set to that header; a server
+at --url must be started with the same setting.
+
+Usage:
+  python loadtest.py                                   # in-process, 1,2,4 clients x 20 s
+  python loadtest.py --ramp 1:10,4:30,8:30 --download-ratio 0.3
+  UNICO_CLIENT_HEADER=X-Loadtest-Client uvicorn main:app --port 9981 &
+  python loadtest.py --url http://127.0.0.1:9981 --server-pid 1234 --json load.json
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from po_generator import generate_po
+
+SAMPLES_GLOB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docs", "samples", "*.pdf")
+REQUEST_TIMEOUT_SECONDS = 600
+SAMPLE_INTERVAL_SECONDS = 0.5
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+DEFAULT_RETRY_AFTER_SECONDS = 1
+DEFAULT_CLIENT_HEADER = "X-Loadtest-Client"
+
+
+def parse_ramp(value):
+    # "1:10,4:30" -> [(1 client, 10 s), (4 clients, 30 s)]
+    stages = []
+    for part in value.split(","):
+        clients, seconds = part.split(":")
+        stages.append((int(clients), float(seconds)))
+    return stages
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile; None without samples
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def multipart_body(field, filename, data):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode("utf-8") + data + f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class ProcessSampler:
+    # Samples CPU time and RSS of a process and its children from /proc
+    # (Linux only; empty results elsewhere)
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            sample = self.sample()
+            if sample is not None:
+                self.samples.append(sample)
+            self._stop.wait(SAMPLE_INTERVAL_SECONDS)
+
+    def sample(self):
+        pids = self._tree(self.pid)
+        if not pids:
+            return None
+        cpu_seconds = 0.0
+        rss_bytes = 0
+        for pid in pids:
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                with open(f"/proc/{pid}/statm") as f:
+                    resident_pages = int(f.read().split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            # utime + stime (fields 14 and 15 of stat, after pid and comm)
+            cpu_seconds += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+            rss_bytes += resident_pages * os.sysconf("SC_PAGE_SIZE")
+        return {"at": time.perf_counter(), "cpu_seconds": cpu_seconds, "rss_bytes": rss_bytes,
+                "processes": len(pids)}
+
+    def _tree(self, root):
+        children = {}
+        try:
+            entries = os.listdir("/proc")
+        except OSError:
+            return []
+        for entry in entries:
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    parent = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+        if not os.path.exists(f"/proc/{root}"):
+            return []
+        pids = [root]
+        for pid in pids:
+            pids.extend(children.get(pid, []))
+        return pids
+
+    def summarize(self, started, finished):
+        window = [sample for sample in self.samples if started <= sample["at"] <= finished]
+        if len(window) < 2:
+            return {"cpu_percent": None, "rss_mb_peak": None, "rss_mb_avg": None, "processes": None}
+        cpu = window[-1]["cpu_seconds"] - window[0]["cpu_seconds"]
+        elapsed = window[-1]["at"] - window[0]["at"]
+        rss = [sample["rss_bytes"] / 1024 / 1024 for sample in window]
+        return {
+            # 100% = one core fully busy
+            "cpu_percent": round(100 * cpu / elapsed, 1) if elapsed else None,
+            "rss_mb_peak": round(max(rss), 1),
+            "rss_mb_avg": round(sum(rss) / len(rss), 1),
+            "processes": max(sample["processes"] for sample in window),
+        }
+
+
+class InProcessServer:
+    # The real app behind uvicorn on a free port, in a background thread.
+    # The load generator shares this process (and its GIL) with the event
+    # loop; extraction itself runs in the job pool's worker processes.
+
+    def __init__(self, client_header):
+        # admission.py reads the header name at import
+        os.environ["UNICO_CLIENT_HEADER"] = client_header
+        import uvicorn
+        import main
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("server failed to start")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+class LoadTest:
+    def __init__(self, base_url, pdfs, download_ratio=0.0, allow_cache=False, seed=0,
+                 client_header=DEFAULT_CLIENT_HEADER):
+        self.base_url = base_url.rstrip("/")
+        self.client_header = client_header
+        self.pdfs = pdfs
+        self.download_ratio = download_ratio
+        self.allow_cache = allow_cache
+        self.random = random.Random(seed)
+        self.results = []
+        self.filenames = []
+        self._lock = threading.Lock()
+
+    def upload(self, client_id):
+        name, data = self.random.choice(self.pdfs)
+        if not self.allow_cache:
+            data = data + b"\n%" + uuid.uuid4().hex.encode("ascii") + b"\n"
+        body, content_type = multipart_body("file", name, data)
+        request = urllib.request.Request(
+            f"{self.base_url}/upload", data=body, method="POST", headers={"Content-Type": content_type}
+        )
+        status, payload, retry_after = self._send(request, client_id)
+        if status == 200:
+            filename = json.loads(payload).get("filename")
+            if filename:
+                with self._lock:
+                    self.filenames.append(filename)
+        return status, retry_after
+
+    def download(self, client_id):
+        with self._lock:
+            filename = self.random.choice(self.filenames) if self.filenames else None
+        if filename is None:
+            return (*self.upload(client_id), "upload")
+        status, _, retry_after = self._send(urllib.request.Request(f"{self.base_url}/download/{filename}"), client_id)
+        return status, retry_after, "download"
+
+    def _send(self, request, client_id):
+        if self.client_header:
+            request.add_header(self.client_header, client_id)
+        # (status, body, Retry-After seconds or None)
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT_SECONDS) as response:
+                return response.status, response.read(), None
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), _retry_after(e.headers.get("Retry-After"))
+
+    def client(self, stage, deadline, client_id):
+        # One simulated user: back-to-back requests until the stage ends,
+        # pausing for Retry-After whenever admission control turns it away
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            operation = "upload"
+            error = None
+            retry_after = None
+            try:
+                if self.download_ratio and self.random.random() < self.download_ratio:
+                    status, retry_after, operation = self.download(client_id)
+                else:
+                    status, retry_after = self.upload(client_id)
+            except Exception as e:
+                status, error = None, f"{type(e).__name__}: {e}"
+            finished = time.perf_counter()
+            rejected = status == 429
+            if status is not None and status >= 400 and not rejected:
+                error = f"HTTP {status}"
+            with self._lock:
+                self.results.append({
+                    "stage": stage, "operation": operation, "started": started, "finished": finished,
+                    "latency": finished - started, "status": status, "error": error, "rejected": rejected,
+                })
+            if rejected:
+                wait = DEFAULT_RETRY_AFTER_SECONDS if retry_after is None else retry_after
+                time.sleep(max(0.0, min(wait, deadline - time.perf_counter())))
+
+    def run_stage(self, stage, clients, seconds):
+        started = time.perf_counter()
+        deadline = started + seconds
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            for index in range(clients):
+                executor.submit(self.client, stage, deadline, f"loadtest-{index + 1}")
+        # In-flight requests finish after the deadline; they still count
+        return started, time.perf_counter()
+
+
+def _retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize_requests(results, elapsed):
+    # 429s are reported as "rejected" only: they are neither requests
+    # served (throughput, latency) nor errors
+    rejected = sum(1 for result in results if result["rejected"])
+    results = [result for result in results if not result["rejected"]]
+    summary = {"requests": len(results), "rejected": rejected}
+    errors = [result for result in results if result["error"]]
+    summary["errors"] = len(errors)
+    summary["error_rate"] = round(len(errors) / len(results), 4) if results else None
+    summary["throughput_rps"] = round(len(results) / elapsed, 3) if elapsed else None
+    summary["operations"] = {}
+    for operation in sorted({result["operation"] for result in results}):
+        latencies = [result["latency"] for result in results if result["operation"] == operation and not result["error"]]
+        summary["operations"][operation] = {
+            "requests": sum(1 for result in results if result["operation"] == operation),
+            "ok": len(latencies),
+            "p50_seconds": _round(percentile(latencies, 0.50)),
+            "p95_seconds": _round(percentile(latencies, 0.95)),
+            "p99_seconds": _round(percentile(latencies, 0.99)),
+            "max_seconds": _round(max(latencies) if latencies else None),
+        }
+    summary["error_samples"] = sorted({result["error"] for result in errors})[:5]
+    return summary
+
+
+def _round(value):
+    return round(value, 4) if value is not None else None
+
+
+def load_pdfs(args, work_dir):
+    pdfs = []
+    paths = list(args.pdf or [])
+    if args.samples:
+        paths.extend(sorted(glob.glob(SAMPLES_GLOB)))
+    for pages in args.generate_pages:
+        path = os.path.join(work_dir, f"synthetic_{pages}p.pdf")
+        generate_po(path, pages, args.lines_per_page, seed=pages)
+        paths.append(path)
+    for path in paths:
+        with open(path, "rb") as f:
+            pdfs.append((os.path.basename(path), f.read()))
+    return pdfs
+
+
+def print_report(report):
+    header = (f"{'stage':>5} {'clients':>7} {'secs':>6} {'reqs':>5} {'429s':>5} {'rps':>7} {'err %':>6} "
+              f"{'op':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'cpu %':>6} {'rss MB':>7}")
+    print(header)
+    print("-" * len(header))
+    for stage in report["stages"]:
+        resources = stage["resources"]
+        # A stage where every request got 429 has no latencies to show
+        operations = stage["operations"] or {"-": {"p50_seconds": None, "p95_seconds": None, "p99_seconds": None}}
+        for index, (operation, latency) in enumerate(operations.items()):
+            prefix = (
+                f"{stage['stage']:>5} {stage['clients']:>7} {stage['elapsed_seconds']:>6.1f} "
+                f"{stage['requests']:>5} {stage['rejected']:>5} {stage['throughput_rps']:>7.3f} "
+                f"{100 * (stage['error_rate'] or 0):>6.1f}"
+            ) if index == 0 else " " * 47
+            suffix = f" {_fmt(resources['cpu_percent']):>6} {_fmt(resources['rss_mb_peak']):>7}" if index == 0 else ""
+            print(f"{prefix} {operation:>8} {_fmt(latency['p50_seconds']):>7} {_fmt(latency['p95_seconds']):>7} "
+                  f"{_fmt(latency['p99_seconds']):>7}{suffix}")
+    for stage in report["stages"]:
+        for error in stage["error_samples"]:
+            print(f"❌ stage {stage['stage']}: {error}")
+
+
+def _fmt(value):
+    return "-" if value is None else value
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target a running server instead of starting one in-process")
+    parser.add_argument("--server-pid", type=int, help="with --url: server PID to sample CPU/RSS from")
+    parser.add_argument("--ramp", default="1:20,2:20,4:20", type=parse_ramp,
+                        help="comma-separated clients:seconds stages")
+    parser.add_argument("--download-ratio", type=float, default=0.0,
+                        help="share of requests that download an earlier result instead of uploading")
+    parser.add_argument("--pdf", action="append", help="PDF to upload (repeatable)")
+    parser.add_argument("--no-samples", dest="samples", action="store_false", help="skip docs/samples PDFs")
+    parser.add_argument("--generate-pages", default="1,10",
+                        type=lambda value: [int(pages) for pages in value.split(",") if pages],
+                        help="comma-separated page counts of synthetic POs to add")
+    parser.add_argument("--lines-per-page", type=int, default=25)
+    parser.add_argument("--client-header", default=os.environ.get("UNICO_CLIENT_HEADER") or DEFAULT_CLIENT_HEADER,
+                        help="header carrying each simulated user's client id (the server's UNICO_CLIENT_HEADER)")
+    parser.add_argument("--allow-cache", action="store_true", help="upload identical bytes (result cache hits)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    parser.add_argument("--max-error-rate", type=float, help="exit 1 if any stage goes above this error rate")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        pdfs = load_pdfs(args, work_dir)
+    if not pdfs:
+        sys.exit("No PDFs to upload (--pdf, docs/samples or --generate-pages)")
+
+    server = None
+    if args.url:
+        base_url, server_pid = args.url, args.server_pid
+    else:
+        server = InProcessServer(args.client_header)
+        server.start()
+        base_url, server_pid = server.url, os.getpid()
+
+    sampler = ProcessSampler(server_pid) if server_pid else None
+    if sampler is not None:
+        sampler.start()
+
+    load = LoadTest(base_url, pdfs, args.download_ratio, args.allow_cache, args.seed, args.client_header)
+    stages = []
+    run_started = time.perf_counter()
+    try:
+        for stage, (clients, seconds) in enumerate(args.ramp, 1):
+            print(f"⏱  stage {stage}: {clients} clients for {seconds:g}s ...", file=sys.stderr)
+            started, finished = load.run_stage(stage, clients, seconds)
+            results = [result for result in load.results if result["stage"] == stage]
+            stages.append({
+                "stage": stage,
+                "clients": clients,
+                "elapsed_seconds": round(finished - started, 3),
+                **summarize_requests(results, finished - started),
+                "resources": sampler.summarize(started, finished) if sampler else {},
+            })
+    finally:
+        run_finished = time.perf_counter()
+        if sampler is not None:
+            sampler.stop()
+        if server is not None:
+            server.stop()
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "target": args.url or "in-process",
+        "pdfs": [name for name, _ in pdfs],
+        "download_ratio": args.download_ratio,
+        "cache_busting": not args.allow_cache,
+        "client_header": args.client_header,
+        "stages": stages,
+        "total": {
+            **summarize_requests(load.results, run_finished - run_started),
+            "resources": sampler.summarize(run_started, run_finished) if sampler else {},
+        },
+    }
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.max_error_rate is not None:
+        over = [stage for stage in stages if (stage["error_rate"] or 0) > args.max_error_rate]
+        for stage in over:
+            print(f"❌ stage {stage['stage']}: error rate {stage['error_rate']} > {args.max_error_rate}")
+        if over:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
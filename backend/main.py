@@ -1,13 +1,105 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import time
+# Start of the import-time measurement reported on /health
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
+from typing import List, Optional
+from datetime import date
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
+from contextlib import asynccontextmanager
+import asyncio
+import json
 import os
-import shutil
+import re
+import sys
 import uuid
-from extractor import UnicoExtractor
+from urllib.parse import quote
+import metrics
+from admission import AdmissionController, AdmissionRejected, client_key
+from jobs import (
+    JobManager, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, WARMUP_ENABLED, registry_job_dict,
+    run_documents_write, run_line_extraction, run_streaming_extraction
+)
+from batch import BatchError, MAX_BATCH_BYTES, save_batch_uploads, run_batch
+from cache import ResultCache
+from registry import REGISTRY_PATH, Registry
+from orders import OrderStore
+from ledger import LEDGER_ENABLED, Ledger
+from extractor import EXTRACTOR_VERSION, UnicoExtractor, stage_timer
+from formats import OUTPUT_FORMATS, XLSX_MEDIA_TYPE
+from frames import pipeline_enabled
+from janitor import (
+    Janitor, OUTPUTS_MAX_BYTES, OUTPUTS_TTL_SECONDS, UPLOADS_MAX_BYTES, UPLOADS_TTL_SECONDS
+)
+from ingest import MAX_UPLOAD_BYTES, RequestBodyLimit, UploadTooLarge, spool_upload
+from profiling import PROFILE_DIR, PROFILE_TOKEN_HEADER, profile_paths, profiling_allowed, profiling_enabled
+
+UPLOAD_DIR = "uploads"
+OUTPUT_DIR = "outputs"
+FRONTEND_DIR = "../frontend"
+
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+if profiling_enabled():
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+# Several API workers (UNICO_WEB_WORKERS) share jobs, artifacts, the
+# result cache and janitor state through this SQLite database
+WEB_WORKERS = int(os.environ.get("UNICO_WEB_WORKERS", "1"))
+registry = Registry(REGISTRY_PATH or os.path.join(OUTPUT_DIR, ".registry.sqlite3"))
+
+# Retention for uploads/ and outputs/ (see janitor.py)
+janitor = Janitor(registry)
+janitor.add_directory(UPLOAD_DIR, UPLOADS_TTL_SECONDS, UPLOADS_MAX_BYTES)
+janitor.add_directory(OUTPUT_DIR, OUTPUTS_TTL_SECONDS, OUTPUTS_MAX_BYTES)
+if profiling_enabled():
+    janitor.add_directory(PROFILE_DIR, OUTPUTS_TTL_SECONDS, OUTPUTS_MAX_BYTES)
+
+# Workbooks from the pandas pipeline carry an extra "Tổng hợp" sheet, so
+# they are cached apart from the plain ones
+RESULT_VERSION = f"{EXTRACTOR_VERSION}+summary" if pipeline_enabled() else EXTRACTOR_VERSION
+result_cache = ResultCache(OUTPUT_DIR, RESULT_VERSION, registry, on_evict=janitor.record_removed)
+# Every extracted line, queryable without the PDF (see orders.py), and
+# optionally appended to the month's master ledger (see ledger.py)
+ledger = Ledger(registry) if LEDGER_ENABLED else None
+orders = OrderStore(registry, EXTRACTOR_VERSION, on_record=ledger.record_document if ledger else None)
+jobs = JobManager(cache=result_cache, registry=registry, orders=orders)
+# At most one upload per pool worker is being processed and a bounded
+# number wait behind them; the rest get 429 (see admission.py)
+admission = AdmissionController(jobs.max_workers)
 
-app = FastAPI(title="UNICO Order Extractor API")
+# Modules that should only load on first use (in workers), never at import
+HEAVY_MODULES = ["pdfplumber", "pdfminer", "openpyxl", "pandas"]
+
+startup_report = {
+    "import_seconds": round(time.perf_counter() - IMPORT_STARTED, 3),
+    "heavy_modules_at_import": [name for name in HEAVY_MODULES if name in sys.modules],
+    "pandas_pipeline": pipeline_enabled(),
+    "warmup": None,
+}
+
+@asynccontextmanager
+async def lifespan(app):
+    if WARMUP_ENABLED:
+        # Before yield: the server only starts accepting once workers are primed
+        started = time.perf_counter()
+        workers = await jobs.warm_up()
+        startup_report["warmup"] = {
+            "seconds": round(time.perf_counter() - started, 3),
+            "workers": len({worker["pid"] for worker in workers}),
+        }
+    retention = asyncio.create_task(janitor.run_forever())
+    yield
+    retention.cancel()
+    jobs.shutdown()
+    if ledger:
+        # After the pool: finished jobs may still queue their documents
+        ledger.close()
+
+app = FastAPI(title="UNICO Order Extractor API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -17,52 +109,517 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-UPLOAD_DIR = "uploads"
-OUTPUT_DIR = "outputs"
-FRONTEND_DIR = "../frontend"
+# Room for multipart boundaries and form fields around the PDF itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_LIMITS = {
+    "/upload": MAX_UPLOAD_BYTES,
+    "/upload/stream": MAX_UPLOAD_BYTES,
+    "/jobs": MAX_UPLOAD_BYTES,
+    "/batch": MAX_BATCH_BYTES,
+}
 
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# Bodies without Content-Length (or a false one) are cut off as they are
+# received, before the form parser has written them all to disk
+app.add_middleware(
+    RequestBodyLimit,
+    limits={path: limit + MULTIPART_OVERHEAD_BYTES for path, limit in UPLOAD_LIMITS.items()},
+)
+
+@app.middleware("http")
+async def limit_upload_size(request, call_next):
+    # Reject oversized uploads from Content-Length before the body is read
+    limit = UPLOAD_LIMITS.get(request.url.path) if request.method == "POST" else None
+    length = request.headers.get("content-length", "")
+    if limit is not None and length.isdigit() and int(length) > limit + MULTIPART_OVERHEAD_BYTES:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"File vượt quá dung lượng cho phép ({limit // (1024 * 1024)} MB)"}
+        )
+    return await call_next(request)
 
-extractor = UnicoExtractor()
+# Routes that start an extraction; /batch counts as one request
+ADMITTED_ROUTES = {"/upload", "/upload/stream", "/jobs", "/batch"}
+
+async def _release_after(body, ticket):
+    # Streamed responses (SSE, CSV) are still working until the last chunk
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        admission.release(ticket)
+
+@app.middleware("http")
+async def admit_uploads(request, call_next):
+    # Turn away extraction requests over the queue or per-client limit
+    # before the body is read, with a Retry-After from recent timings
+    if request.method != "POST" or request.url.path not in ADMITTED_ROUTES:
+        return await call_next(request)
+    try:
+        ticket = admission.admit(client_key(request))
+    except AdmissionRejected as e:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": f"Hệ thống đang bận, vui lòng thử lại sau {e.retry_after} giây"},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    request.state.admission_ticket = ticket
+    try:
+        response = await call_next(request)
+    except BaseException:
+        admission.release(ticket)
+        raise
+    if getattr(request.state, "admission_detached", False):
+        # Released by the job's cleanup instead (POST /jobs)
+        return response
+    response.body_iterator = _release_after(response.body_iterator, ticket)
+    return response
+
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template so /jobs/{job_id} stays one series
+    route = request.scope.get("route")
+    metrics.request_duration.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code,
+    )
+    return response
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "unico-backend"}
+    return {
+        "status": "healthy",
+        "service": "unico-backend",
+        "cache": result_cache.stats(),
+        "retention": janitor.stats(),
+        "ledger": ledger.stats() if ledger else {"enabled": False},
+        "admission": admission.stats(),
+        "startup": startup_report
+    }
 
-@app.post("/upload")
-async def upload_pdf(file: UploadFile = File(...)):
+async def _spool_pdf(file):
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Chỉ chấp nhận file PDF")
     
+    # Small PDFs stay in memory, large ones spill to a temp file in
+    # UPLOAD_DIR that is removed once processing ends
+    try:
+        spooled = await spool_upload(file, UPLOAD_DIR)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    metrics.bytes_in.inc(spooled.size)
+    return spooled
+
+def _hold_files(spooled, output_path=None):
+    # Keep the janitor away from the spill file and the workbook until
+    # processing ends; returns the cleanup to call at that point
+    temp_path = spooled.temp_path
+    janitor.hold(temp_path)
+    janitor.hold(output_path)
+    
+    def cleanup():
+        spooled.cleanup()
+        janitor.release(temp_path)
+        janitor.release(output_path)
+    return cleanup
+
+def _require_profile_access(request):
+    # Profiling is opt-in per request and only for holders of UNICO_PROFILE_TOKEN
+    if not profiling_allowed(request.headers.get(PROFILE_TOKEN_HEADER, "")):
+        raise HTTPException(status_code=403, detail="Không có quyền profiling")
+
+async def _submit_upload(file, release=None, profile=False):
+    spooled = await _spool_pdf(file)
+    
     file_id = str(uuid.uuid4())
-    temp_pdf = os.path.join(UPLOAD_DIR, f"{file_id}.pdf")
     output_xlsx = os.path.join(OUTPUT_DIR, f"{file_id}.xlsx")
     
+    # Content address for the result cache: PDF bytes + extractor version
+    cache_key = result_cache.key(spooled.digest)
+    
+    # Cache lookup and job record are registry writes: off the event loop
+    return await asyncio.to_thread(
+        jobs.submit, spooled.source, output_xlsx,
+        source_name=file.filename, cache_key=cache_key, cleanup=_with_release(_hold_files(spooled, output_xlsx), release),
+        source_hash=spooled.digest, source_bytes=spooled.size,
+        profile_dir=PROFILE_DIR if profile else None
+    )
+
+def _with_release(cleanup, release):
+    if release is None:
+        return cleanup
+    
+    def cleanup_and_release():
+        try:
+            cleanup()
+        finally:
+            release()
+    return cleanup_and_release
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: Request, file: UploadFile = File(...), profile: bool = False):
+    # Hand the work to the process pool and answer right away; the
+    # admission ticket is held by the job until it finishes
+    if profile:
+        _require_profile_access(request)
+    ticket = request.state.admission_ticket
+    job = await _submit_upload(file, release=lambda: admission.release(ticket), profile=profile)
+    request.state.admission_detached = True
+    response = {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}"
+    }
+    if profile:
+        response["profile_url"] = f"/jobs/{job.id}/profile"
+    return response
+
+def _timings(result):
+    stats = result.get("stats", {})
+    return {
+        "stages": {stage: round(seconds, 4) for stage, seconds in stats.get("timings", {}).items()},
+        "pages": stats.get("pages"),
+        "rows": stats.get("rows"),
+        "peak_rss_mb": stats.get("peak_rss_mb"),
+        "peak_rss_growth_mb": stats.get("peak_rss_growth_mb"),
+        "skipped_pages": stats.get("skipped_pages", []),
+        "triage_misses": stats.get("triage_misses", []),
+    }
+
+@app.get("/jobs/{job_id}/profile")
+async def get_job_profile(request: Request, job_id: str, output_format: str = Query("json", alias="format")):
+    # JSON report (stages, slowest pages, top functions) or the raw
+    # cProfile dump (format=pstats) for snakeviz / python -m pstats
+    _require_profile_access(request)
     try:
-        with open(temp_pdf, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Process PDF
-        items_count = extractor.extract(temp_pdf, output_xlsx)
-        
-        return {
-            "filename": f"{file_id}.xlsx",
-            "items_count": items_count,
-            "message": "Trích xuất thành công!"
-        }
+        uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Profile không tồn tại")
+    profile_path, report_path = profile_paths(PROFILE_DIR, job_id)
+    if output_format == "pstats":
+        if not os.path.exists(profile_path):
+            raise HTTPException(status_code=404, detail="Profile không tồn tại")
+        return FileResponse(profile_path, media_type="application/octet-stream", filename=f"unico_{job_id}.prof")
+    if not os.path.exists(report_path):
+        job = jobs.get(job_id)
+        if job is not None and job.status in (JOB_QUEUED, JOB_RUNNING):
+            raise HTTPException(status_code=409, detail="Job chưa hoàn tất")
+        raise HTTPException(status_code=404, detail="Profile không tồn tại")
+    return FileResponse(report_path, media_type="application/json")
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, timings: bool = False):
+    job = jobs.get(job_id)
+    if job is None:
+        # Submitted to another API worker, or already pruned from memory
+        record = registry.get_job(job_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Job không tồn tại")
+        info = registry_job_dict(record)
+        if timings and record["status"] != JOB_FAILED:
+            info["timings"] = _timings(record)
+        return info
+    info = job.to_dict()
+    if timings and job.result is not None:
+        info["timings"] = _timings(job.result)
+    return info
+
+async def _stream_rows(file, output_format):
+    # Unstyled formats: parse in the pool, map the rows here and stream
+    # them back without writing a workbook or anything in outputs/
+    spooled = await _spool_pdf(file)
+    cleanup = _hold_files(spooled)
+    try:
+        result = await jobs.run(run_line_extraction, spooled.source)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Lỗi xử lý: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Lỗi xử lý: {e}")
+    finally:
+        cleanup()
+    
+    extractor = UnicoExtractor()
+    stats = {}
+    with stage_timer(stats, "mapping"):
+        rows = extractor.build_rows([(result["header"], result["lines"])])
+    # SQLite write under the registry lock (and the ledger hook): off the event loop
+    await asyncio.to_thread(orders.record_document, spooled.digest, file.filename, result["header"], result["lines"])
+    stats["rows"] = len(rows)
+    metrics.observe_stats(stats)
+    
+    serializer, media_type, extension = OUTPUT_FORMATS[output_format]
+    name = os.path.splitext(os.path.basename(file.filename))[0]
+    return StreamingResponse(
+        serializer(extractor.columns, rows),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename*=utf-8''{quote(f'unico_extract_{name}.{extension}')}",
+            "X-Items-Count": str(len(rows)),
+        }
+    )
+
+@app.post("/upload")
+async def upload_pdf(request: Request, file: UploadFile = File(...), timings: bool = False,
+                     output_format: str = Query("xlsx", alias="format"), profile: bool = False):
+    output_format = output_format.lower()
+    if profile:
+        _require_profile_access(request)
+        if output_format != "xlsx":
+            raise HTTPException(status_code=400, detail="Profiling chỉ hỗ trợ định dạng xlsx")
+    if output_format != "xlsx":
+        if output_format not in OUTPUT_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Định dạng không hỗ trợ: {output_format} (xlsx, {', '.join(OUTPUT_FORMATS)})"
+            )
+        return await _stream_rows(file, output_format)
+    
+    # Same job path as /jobs, but wait for the result before answering
+    job = await _submit_upload(file, profile=profile)
+    await jobs.wait(job)
+    
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=f"Lỗi xử lý: {job.error}")
+    
+    response = {
+        "filename": os.path.basename(job.output_path),
+        "items_count": job.result["items_count"],
+        "skipped_pages": job.result["stats"].get("skipped_pages", []),
+        "job_id": job.id,
+        "cached": job.cached,
+        "message": "Trích xuất thành công!"
+    }
+    if timings:
+        response["timings"] = _timings(job.result)
+    if profile:
+        with open(profile_paths(PROFILE_DIR, job.id)[1], encoding="utf-8") as f:
+            response["profile"] = json.load(f)
+        response["profile_url"] = f"/jobs/{job.id}/profile"
+    return response
+
+def _record_stream_result(source_hash, source_name, output_xlsx, cache_key, data):
+    # Registry, order-line store and cache writes of a finished SSE upload;
+    # each takes the registry write lock, so run in a thread
+    registry.record_artifact(output_xlsx, source_hash=source_hash)
+    orders.record_document(source_hash, source_name, data["header"], data["lines"])
+    result_cache.put(cache_key, output_xlsx, data["items_count"])
+
+class CleanupStreamingResponse(StreamingResponse):
+    # Runs cleanup once the response is over, however it ends: a body
+    # generator's finally never runs when the client leaves before the
+    # first chunk, and Starlette skips background tasks on a disconnect
+    def __init__(self, content, cleanup, **kwargs):
+        super().__init__(content, **kwargs)
+        self.cleanup = cleanup
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.cleanup()
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/upload/stream")
+async def upload_pdf_stream(file: UploadFile = File(...)):
+    # Server-sent events while the PDF is parsed: "start" (page count,
+    # columns, header), one "page" per page with its mapped rows, then
+    # "done" with the download link, or "error"
+    spooled = await _spool_pdf(file)
+    cache_key = result_cache.key(spooled.digest)
+    
+    # Same PDF already extracted: "done" straight away with that workbook
+    entry = await asyncio.to_thread(result_cache.get, cache_key)
+    if entry is not None:
+        spooled.cleanup()
+        metrics.extractions.inc(result="cached")
+        done = _sse("done", {
+            "filename": entry["filename"],
+            "items_count": entry["items_count"],
+            "cached": True,
+            "download_url": f"/download/{entry['filename']}",
+            "message": "Trích xuất thành công!"
+        })
+        return StreamingResponse(
+            iter([done]),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    file_id = str(uuid.uuid4())
+    output_xlsx = os.path.join(OUTPUT_DIR, f"{file_id}.xlsx")
+    cleanup = _hold_files(spooled, output_xlsx)
+    
+    async def events():
+        try:
+            async for event, data in jobs.stream(run_streaming_extraction, spooled.source, output_xlsx):
+                if event != "result":
+                    yield _sse(event, data)
+                    continue
+                await asyncio.to_thread(_record_stream_result, spooled.digest, file.filename, output_xlsx,
+                                        cache_key, data)
+                yield _sse("done", {
+                    "filename": f"{file_id}.xlsx",
+                    "items_count": data["items_count"],
+                    "cached": False,
+                    "skipped_pages": data["stats"].get("skipped_pages", []),
+                    "download_url": f"/download/{file_id}.xlsx",
+                    "message": "Trích xuất thành công!"
+                })
+        except Exception as e:
+            yield _sse("error", {"detail": f"Lỗi xử lý: {e}"})
+    
+    return CleanupStreamingResponse(
+        events(),
+        cleanup,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/batch")
+async def upload_batch(files: List[UploadFile] = File(...)):
+    try:
+        # Copying, unzipping and hashing up to MAX_BATCH_BYTES: off the event loop
+        sources = await asyncio.to_thread(save_batch_uploads, files, UPLOAD_DIR)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except BatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    file_id = str(uuid.uuid4())
+    output_xlsx = os.path.join(OUTPUT_DIR, f"{file_id}.xlsx")
+    
+    metrics.bytes_in.inc(sum(spooled.size for _, spooled in sources))
+    cleanups = [_hold_files(spooled) for _, spooled in sources]
+    janitor.hold(output_xlsx)
+    
+    try:
+        summary = await run_batch(jobs, sources, output_xlsx, orders=orders)
+    finally:
+        for cleanup in cleanups:
+            cleanup()
+        janitor.release(output_xlsx)
+    if os.path.exists(output_xlsx):
+        registry.record_artifact(output_xlsx)
+    if summary["failed_count"] == summary["files_count"]:
+        raise HTTPException(status_code=500, detail={
+            "message": "Lỗi xử lý: không trích xuất được file nào",
+            "files": summary["files"]
+        })
+    
+    return {
+        "filename": f"{file_id}.xlsx",
+        **summary,
+        "message": "Trích xuất thành công!"
+    }
+
+def _order_filters(mpo_no, style, date_from, date_to, location):
+    return {"mpo_no": mpo_no, "style": style, "date_from": date_from, "date_to": date_to, "location": location}
+
+@app.get("/orders/lines")
+async def query_order_lines(mpo_no: Optional[str] = None, style: Optional[str] = None,
+                            date_from: Optional[date] = None, date_to: Optional[date] = None,
+                            location: Optional[str] = None, limit: int = Query(1000, ge=1, le=10000),
+                            offset: int = Query(0, ge=0)):
+    # Stored lines, filtered by MPO-NO, STYLE, issued date range (inclusive) and TỈNH
+    total, lines = orders.query_lines(
+        limit=limit, offset=offset, **_order_filters(mpo_no, style, date_from, date_to, location)
+    )
+    return {"count": total, "limit": limit, "offset": offset, "lines": lines}
+
+@app.get("/orders/mpo/{mpo_no}")
+async def get_mpo(mpo_no: str):
+    # Has this MPO-NO been extracted before, and from which PDFs
+    documents = orders.documents_for_mpo(mpo_no)
+    return {"mpo_no": mpo_no, "processed": bool(documents), "documents": documents}
+
+@app.get("/orders/export")
+async def export_orders(mpo_no: Optional[str] = None, style: Optional[str] = None,
+                        date_from: Optional[date] = None, date_to: Optional[date] = None,
+                        location: Optional[str] = None,
+                        output_format: str = Query("xlsx", alias="format")):
+    # The 27-column output rebuilt from stored lines, no PDF involved
+    documents = orders.export_documents(**_order_filters(mpo_no, style, date_from, date_to, location))
+    if not documents:
+        raise HTTPException(status_code=404, detail="Không có dòng nào phù hợp")
+    
+    output_format = output_format.lower()
+    if output_format in OUTPUT_FORMATS:
+        extractor = UnicoExtractor()
+        serializer, media_type, extension = OUTPUT_FORMATS[output_format]
+        return StreamingResponse(
+            serializer(extractor.columns, extractor.build_rows(documents)),
+            media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename=unico_orders.{extension}"}
+        )
+    if output_format != "xlsx":
+        raise HTTPException(
+            status_code=400,
+            detail=f"Định dạng không hỗ trợ: {output_format} (xlsx, {', '.join(OUTPUT_FORMATS)})"
+        )
+    
+    file_id = str(uuid.uuid4())
+    output_xlsx = os.path.join(OUTPUT_DIR, f"{file_id}.xlsx")
+    await jobs.run(run_documents_write, documents, output_xlsx, extraction=False)
+    registry.record_artifact(output_xlsx)
+    janitor.hold(output_xlsx)
+    return FileResponse(
+        output_xlsx,
+        media_type=XLSX_MEDIA_TYPE,
+        filename="unico_orders.xlsx",
+        background=BackgroundTask(janitor.release, output_xlsx)
+    )
+
+def _require_ledger():
+    if ledger is None:
+        raise HTTPException(status_code=404, detail="Chế độ sổ tổng chưa được bật (UNICO_LEDGER_ENABLED=1)")
+
+@app.get("/ledger")
+async def list_ledgers():
+    _require_ledger()
+    return {"months": [
+        {**entry, "download_url": f"/ledger/{entry['month']}"} for entry in ledger.months()
+    ]}
+
+@app.get("/ledger/{month}")
+async def download_ledger(month: str):
+    _require_ledger()
+    if not re.fullmatch(r"\d{4}-\d{2}", month):
+        raise HTTPException(status_code=400, detail="Tháng không hợp lệ (YYYY-MM)")
+    # Served from a copy: appends rewrite the end of the ledger in place
+    snapshot = os.path.join(OUTPUT_DIR, f".ledger-{uuid.uuid4()}.xlsx")
+    if not await asyncio.to_thread(ledger.snapshot, month, snapshot):
+        raise HTTPException(status_code=404, detail="Không có sổ tổng cho tháng này")
+    return FileResponse(
+        snapshot,
+        media_type=XLSX_MEDIA_TYPE,
+        filename=f"UNICO_ledger_{month}.xlsx",
+        background=BackgroundTask(os.remove, snapshot)
+    )
+
+@app.get("/metrics")
+async def get_metrics():
+    # Prometheus scrape target
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/download/{filename}")
 async def download_excel(filename: str):
     file_path = os.path.join(OUTPUT_DIR, filename)
+    # Held until the response has been sent so the janitor can't remove
+    # the file mid-download
+    janitor.hold(file_path)
     if not os.path.exists(file_path):
+        janitor.release(file_path)
+        if janitor.was_removed(filename):
+            raise HTTPException(status_code=410, detail="File đã hết hạn và bị xóa")
         raise HTTPException(status_code=404, detail="File không tồn tại")
     return FileResponse(
         file_path,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename=f"unico_extract_{filename}"
+        media_type=XLSX_MEDIA_TYPE,
+        filename=f"unico_extract_{filename}",
+        background=BackgroundTask(janitor.release, file_path)
     )
 
 # Serve frontend
@@ -76,4 +633,6 @@ app.mount("/static", StaticFiles(directory=FRONTEND_DIR), name="static")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=9981)
+    # Multiple workers need the import string; each worker runs its own
+    # extraction pool of UNICO_MAX_WORKERS processes
+    uvicorn.run("main:app", host="0.0.0.0", port=9981, workers=WEB_WORKERS)
@@ -0,0 +1,168 @@
+import bisect
+import threading
+
+# Minimal Prometheus text-format (0.0.4) metrics. Recording is a dict
+# update under a lock; all formatting work happens on scrape.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+PAGE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+ROW_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (non-cumulative) + overflow, sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_duration = registry.histogram(
+    "unico_extraction_stage_duration_seconds",
+    "Time spent in each extraction stage (open, header, tables, mapping, write)",
+    labels=("stage",),
+)
+document_pages = registry.histogram(
+    "unico_document_pages", "Pages per extracted document", buckets=PAGE_BUCKETS,
+)
+document_rows = registry.histogram(
+    "unico_document_rows", "Order lines per extracted document", buckets=ROW_BUCKETS,
+)
+extractions = registry.counter(
+    "unico_extractions_total", "Finished extraction tasks by result (done, failed, cached)", labels=("result",),
+)
+errors = registry.counter(
+    "unico_extraction_errors_total", "Failed extractions by exception type", labels=("type",),
+)
+bytes_in = registry.counter("unico_upload_bytes_total", "PDF bytes received")
+bytes_out = registry.counter("unico_output_bytes_total", "Workbook bytes written")
+retention_files_removed = registry.counter(
+    "unico_retention_files_removed_total", "Files removed by the retention janitor", labels=("directory",),
+)
+retention_bytes_reclaimed = registry.counter(
+    "unico_retention_bytes_reclaimed_total", "Bytes reclaimed by the retention janitor", labels=("directory",),
+)
+admission_rejections = registry.counter(
+    "unico_admission_rejections_total", "Upload requests turned away with 429 by reason", labels=("reason",),
+)
+request_duration = registry.histogram(
+    "unico_http_request_duration_seconds", "HTTP request latency by route and status",
+    labels=("method", "route", "status"),
+)
+
+
+def observe_stats(stats):
+    # stats as filled in by UnicoExtractor (see stage_timer)
+    for stage, seconds in stats.get("timings", {}).items():
+        stage_duration.observe(seconds, stage=stage)
+    if "pages" in stats:
+        document_pages.observe(stats["pages"])
+    if "rows" in stats:
+        document_rows.observe(stats["rows"])
+
+
+def observe_error(exc):
+    extractions.inc(result="failed")
+    errors.inc(type=type(exc).__name__)
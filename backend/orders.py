@@ -0,0 +1,147 @@
+import json
+import time
+from datetime import datetime
+
+# Every extracted order line, kept in the registry database so planners
+# can look up a STYLE or an MPO-NO without re-extracting the PDF. Lines
+# are stored per source document (content hash); the full header is kept
+# alongside so exports go through the same 27-column mapping.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    source_hash TEXT PRIMARY KEY,
+    source_filename TEXT,
+    extractor_version TEXT,
+    mpo_no TEXT,
+    season TEXT,
+    buyer TEXT,
+    issued_date TEXT,
+    issued_on TEXT,
+    location TEXT,
+    header TEXT NOT NULL,
+    line_count INTEGER,
+    extracted_at REAL
+);
+CREATE INDEX IF NOT EXISTS documents_mpo_no ON documents (mpo_no);
+
+CREATE TABLE IF NOT EXISTS order_lines (
+    source_hash TEXT NOT NULL,
+    line_no INTEGER NOT NULL,
+    mpo_no TEXT,
+    style TEXT,
+    unit TEXT,
+    qty INTEGER,
+    issued_on TEXT,
+    location TEXT,
+    PRIMARY KEY (source_hash, line_no)
+);
+CREATE INDEX IF NOT EXISTS order_lines_mpo_no ON order_lines (mpo_no);
+CREATE INDEX IF NOT EXISTS order_lines_style ON order_lines (style);
+CREATE INDEX IF NOT EXISTS order_lines_issued_on ON order_lines (issued_on);
+CREATE INDEX IF NOT EXISTS order_lines_location ON order_lines (location);
+"""
+
+MAX_QUERY_LIMIT = 10000
+
+
+def _iso_date(value):
+    # Header dates are dd/mm/yyyy; stored as yyyy-mm-dd so ranges sort
+    try:
+        return datetime.strptime(value, "%d/%m/%Y").date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+class OrderStore:
+    def __init__(self, registry, version, on_record=None):
+        self.registry = registry
+        self.version = version
+        # Called with the same arguments after each document is stored
+        # (the master ledger, see ledger.py)
+        self.on_record = on_record
+        registry.connection().executescript(SCHEMA)
+
+    def record_document(self, source_hash, source_name, header, lines):
+        # Re-extracting the same PDF replaces its lines
+        issued_on = _iso_date(header.get("issued_date"))
+        with self.registry.transaction() as db:
+            db.execute("DELETE FROM order_lines WHERE source_hash = ?", (source_hash,))
+            db.execute(
+                "INSERT OR REPLACE INTO documents (source_hash, source_filename, extractor_version, mpo_no,"
+                " season, buyer, issued_date, issued_on, location, header, line_count, extracted_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (source_hash, source_name, self.version, header.get("mpo_no"), header.get("season"),
+                 header.get("buyer"), header.get("issued_date"), issued_on, header.get("location"),
+                 json.dumps(header, ensure_ascii=False), len(lines), time.time()),
+            )
+            db.executemany(
+                "INSERT INTO order_lines (source_hash, line_no, mpo_no, style, unit, qty, issued_on, location)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (source_hash, line_no, header.get("mpo_no"), line["style"], line["unit"], line["qty"],
+                     issued_on, header.get("location"))
+                    for line_no, line in enumerate(lines, 1)
+                ],
+            )
+        if self.on_record is not None:
+            self.on_record(source_hash, source_name, header, lines)
+
+    def _where(self, mpo_no=None, style=None, date_from=None, date_to=None, location=None):
+        clauses = []
+        params = []
+        if mpo_no:
+            clauses.append("l.mpo_no = ?")
+            params.append(mpo_no)
+        if style:
+            clauses.append("l.style = ?")
+            params.append(style)
+        if date_from:
+            clauses.append("l.issued_on >= ?")
+            params.append(date_from.isoformat())
+        if date_to:
+            clauses.append("l.issued_on <= ?")
+            params.append(date_to.isoformat())
+        if location:
+            clauses.append("l.location = ?")
+            params.append(location)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query_lines(self, limit=1000, offset=0, **filters):
+        where, params = self._where(**filters)
+        db = self.registry.connection()
+        total = db.execute(f"SELECT COUNT(*) FROM order_lines l{where}", params).fetchone()[0]
+        rows = db.execute(
+            "SELECT l.mpo_no, d.season, d.buyer, l.style, l.unit, l.qty, d.issued_date, l.issued_on,"
+            " l.location, l.source_hash, d.source_filename, l.line_no"
+            f" FROM order_lines l JOIN documents d ON d.source_hash = l.source_hash{where}"
+            " ORDER BY l.issued_on, l.mpo_no, l.source_hash, l.line_no LIMIT ? OFFSET ?",
+            params + [min(limit, MAX_QUERY_LIMIT), offset],
+        ).fetchall()
+        return total, [dict(row) for row in rows]
+
+    def documents_for_mpo(self, mpo_no):
+        rows = self.registry.connection().execute(
+            "SELECT source_hash, source_filename, extractor_version, mpo_no, season, buyer, issued_date,"
+            " location, line_count, extracted_at FROM documents WHERE mpo_no = ? ORDER BY extracted_at",
+            (mpo_no,),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def export_documents(self, **filters):
+        # [(header, lines)] for UnicoExtractor.write_documents / build_rows,
+        # one entry per source document in the same order as query_lines
+        where, params = self._where(**filters)
+        rows = self.registry.connection().execute(
+            "SELECT l.source_hash, d.header, l.style, l.unit, l.qty"
+            f" FROM order_lines l JOIN documents d ON d.source_hash = l.source_hash{where}"
+            " ORDER BY l.issued_on, l.mpo_no, l.source_hash, l.line_no",
+            params,
+        )
+        documents = []
+        current_hash = None
+        for row in rows:
+            if row["source_hash"] != current_hash:
+                current_hash = row["source_hash"]
+                documents.append((json.loads(row["header"]), []))
+            documents[-1][1].append({"style": row["style"], "qty": row["qty"], "unit": row["unit"]})
+        return documents
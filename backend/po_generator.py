@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Generate synthetic LL.BEAN-style MPO purchase order PDFs
+
+Layout follows docs/samples: header block on page 1, a ruled 12-column
+table (IDCODE ... AMOUNT) that _parse_table_row understands, and a total
+row at the end, optionally followed by terms pages without an order
+table. Written by hand so no PDF library is needed.
+
+Usage: python po_generator.py output.pdf [pages] [lines_per_page] [terms_pages]
+"""
+
+import random
+import sys
+
+PAGE_WIDTH = 595.5
+PAGE_HEIGHT = 842.25
+
+# Column boundaries taken from the sample POs
+COLUMNS = [43.27, 80.12, 128.31, 227.52, 261.54, 312.56, 346.58, 406.1, 451.46, 482.94, 505.32, 530.53, 573.11]
+TABLE_HEADER = ["IDCODE", "ARTICLE", "DESCRIPTION", "COLOUR\nCODE", "COLOUR", "SIZE",
+                "ORDER - NO", "STYLE", "QTY", "UNIT", "PRICE", "AMOUNT"]
+
+FIRST_PAGE_TABLE_TOP = 315.0
+NEXT_PAGE_TABLE_TOP = 40.0
+HEADER_ROW_HEIGHT = 20.0
+ROW_HEIGHT = 16.0
+FONT_SIZE = 5.5
+MAX_LINES_PER_PAGE = 28
+
+SIGNATURE_BOX = [357.92, 400.44, 442.96, 482.94, 530.53, 573.11]
+
+TERMS = [
+    "1. Delivery: goods must arrive within 30 days of the ship date stated on this order.",
+    "2. Quantity tolerance: +/- 3% of the ordered quantity per style, 5% per shipment.",
+    "3. Payment: T/T 60 days after shipment against original documents.",
+    "4. Quality: any claim must be raised within 14 days of receipt, with 2 samples.",
+    "5. Packing: max 50 kg per roll, 1 packing list per 20 rolls.",
+]
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class _Page:
+    def __init__(self):
+        self.ops = []
+
+    def text(self, x, top, text, size=FONT_SIZE):
+        # top is measured from the top of the page, like pdfplumber
+        self.ops.append(f"BT /F1 {size} Tf {x:.2f} {PAGE_HEIGHT - top:.2f} Td ({_escape(text)}) Tj ET")
+
+    def line(self, x0, top0, x1, top1):
+        self.ops.append(f"{x0:.2f} {PAGE_HEIGHT - top0:.2f} m {x1:.2f} {PAGE_HEIGHT - top1:.2f} l S")
+
+    def cell_text(self, column, top, height, text):
+        lines = text.split("\n")
+        first_baseline = top + (height - FONT_SIZE * 1.2 * (len(lines) - 1)) / 2 + FONT_SIZE * 0.35
+        for offset, line in enumerate(lines):
+            self.text(COLUMNS[column] + 1.5, first_baseline + offset * FONT_SIZE * 1.2, line)
+
+    def grid(self, top, row_heights):
+        bottom = top + sum(row_heights)
+        y = top
+        self.line(COLUMNS[0], y, COLUMNS[-1], y)
+        for height in row_heights:
+            y += height
+            self.line(COLUMNS[0], y, COLUMNS[-1], y)
+        for x in COLUMNS:
+            self.line(x, top, x, bottom)
+
+    def content(self):
+        return "0.5 w\n" + "\n".join(self.ops)
+
+
+def _first_page_header(page, po):
+    page.text(43.27, 40, "UNICO GLOBAL INC.", 9)
+    page.text(43.27, 52, "3F~5F, TAESUNG BUILDING, 34, DONGNAM-RO 18-GIL , SONGPA-GU, SEOUL , REPUBLIC OF KOREA", 6)
+    page.text(43.27, 62, "TEL: + 82-1670-1620 FAX: +82-502- 776- 2640", 6)
+    page.text(230, 80, "PURCHASE ORDER SHEET", 11)
+
+    # Approval boxes, a second ruled table on the page like the samples
+    labels = ["Staff", "Leader", "Manager", "Director", "CEO"]
+    for top in (88.375, 100.0, 125.22):
+        page.line(SIGNATURE_BOX[0], top, SIGNATURE_BOX[-1], top)
+    for x in SIGNATURE_BOX:
+        page.line(x, 88.375, x, 125.22)
+    for x, label in zip(SIGNATURE_BOX, labels):
+        page.text(x + 2, 96, label, 6)
+
+    page.text(43.27, 150, f"- MPO-NO: {po['mpo_no']} - ISSUED DATE: {po['issued_date']} - SEASON: {po['season']}", 7)
+    page.text(43.27, 162, f"- MESSRS: VYMEX COMPANY LIMITED - BUYER: {po['buyer']}", 7)
+    page.text(43.27, 174, "Attn: E-mail:", 7)
+    page.text(43.27, 186, "From: 250162_NGUYEN NHU QUYNH E-mail:", 7)
+    page.text(43.27, 198, "Payment term: T/T AFTER SHIPMENT Trade term: FOB", 7)
+    page.text(43.27, 210, "Ship Date: Ship by:", 7)
+    page.text(43.27, 222, "UNICO GLOBAL VN CO.,LTD", 7)
+    page.text(43.27, 234, f"Ship to: {po['ship_to']} Bill to:", 7)
+    page.text(43.27, 246, "PROVINCE, VIETNAM", 7)
+    page.text(43.27, 258, "Currency: USD", 7)
+
+
+def _line_cells(line):
+    return [
+        line["idcode"], line["article"], line["description"], "W010", "WHITE", '63"',
+        line["order_no"], line["style"], f"{line['qty']:,}", line["unit"], "0.6300",
+        f"{line['qty'] * 0.63:,.3f}",
+    ]
+
+
+def _terms_page(page, number):
+    page.text(43.27, 40, f"TERMS AND CONDITIONS ({number})", 9)
+    for index, term in enumerate(TERMS * 6):
+        page.text(43.27, 60 + index * 12, term, 7)
+    # Signature box: ruled, but far too few columns for an order table
+    top = 60 + len(TERMS) * 6 * 12 + 20
+    for y in (top, top + 12, top + 40):
+        page.line(SIGNATURE_BOX[0], y, SIGNATURE_BOX[-1], y)
+    for x in SIGNATURE_BOX:
+        page.line(x, top, x, top + 40)
+
+
+def make_po(pages=1, lines_per_page=20, seed=0, terms_pages=0):
+    # Returns the PO description: header values plus every order line
+    rng = random.Random(seed)
+    lines_per_page = max(1, min(lines_per_page, MAX_LINES_PER_PAGE))
+    po = {
+        "mpo_no": f"HDM-UB-12-2025-{rng.randint(1, 9999):04d}",
+        "issued_date": "12 Dec 2025",
+        "season": "F26BULK",
+        "buyer": "LL.BEAN",
+        "ship_to": "THUONG HAMLET, TAN AN WARD, BAC NINH",
+        "pages": pages,
+        "terms_pages": terms_pages,
+        "lines": [],
+    }
+    for index in range(pages * lines_per_page):
+        style = f"58{rng.randint(0, 99999):05d}{rng.choice(['R', 'WR', 'T', 'P'])}"
+        po["lines"].append({
+            "idcode": f"F{rng.randint(0, 999999):06d}",
+            "article": "PP15",
+            "description": "NON WOVEN FABRIC 15G",
+            "order_no": f"F26B-1205B-{style[:7]}",
+            "style": style,
+            "qty": rng.randint(1, 5000),
+            "unit": rng.choice(["YDS", "YDS", "YDS", "MTR"]),
+        })
+    return po
+
+
+def write_po_pdf(po, output_path):
+    lines = po["lines"]
+    per_page = -(-len(lines) // po["pages"]) if lines else 0
+    page_contents = []
+
+    for page_index in range(po["pages"]):
+        page = _Page()
+        top = FIRST_PAGE_TABLE_TOP if page_index == 0 else NEXT_PAGE_TABLE_TOP
+        if page_index == 0:
+            _first_page_header(page, po)
+
+        page_lines = lines[page_index * per_page:(page_index + 1) * per_page]
+        rows = [TABLE_HEADER] + [_line_cells(line) for line in page_lines]
+        heights = [HEADER_ROW_HEIGHT] + [ROW_HEIGHT] * len(page_lines)
+        if page_index == po["pages"] - 1:
+            # Total row: no STYLE, so it is never an order line
+            total = sum(line["qty"] for line in lines)
+            rows.append(["", "", "", "", "", "", "", "", f"{total:,}", "YDS", "", ""])
+            heights.append(ROW_HEIGHT)
+
+        page.grid(top, heights)
+        row_top = top
+        for cells, height in zip(rows, heights):
+            for column, text in enumerate(cells):
+                if text:
+                    page.cell_text(column, row_top, height, text)
+            row_top += height
+
+        if page_index == po["pages"] - 1:
+            page.text(43.27, row_top + 20, "Remark:", 7)
+        page_contents.append(page.content())
+
+    for number in range(1, po.get("terms_pages", 0) + 1):
+        page = _Page()
+        _terms_page(page, number)
+        page_contents.append(page.content())
+
+    _write_pdf(page_contents, output_path)
+    return output_path
+
+
+def _write_pdf(page_contents, output_path):
+    # Objects: 1 catalog, 2 pages, 3 font, then (page, content) per page
+    objects = {
+        1: "<< /Type /Catalog /Pages 2 0 R >>",
+        3: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    kids = []
+    for index, content in enumerate(page_contents):
+        page_id = 4 + index * 2
+        content_id = page_id + 1
+        kids.append(f"{page_id} 0 R")
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        stream = content.encode("latin-1")
+        objects[content_id] = stream
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    with open(output_path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = {}
+        for object_id in sorted(objects):
+            offsets[object_id] = f.tell()
+            body = objects[object_id]
+            f.write(f"{object_id} 0 obj\n".encode())
+            if isinstance(body, bytes):
+                f.write(f"<< /Length {len(body)} >>\nstream\n".encode())
+                f.write(body)
+                f.write(b"\nendstream")
+            else:
+                f.write(body.encode("latin-1"))
+            f.write(b"\nendobj\n")
+
+        xref_offset = f.tell()
+        count = max(objects) + 1
+        f.write(f"xref\n0 {count}\n".encode())
+        f.write(b"0000000000 65535 f \n")
+        for object_id in range(1, count):
+            f.write(f"{offsets[object_id]:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def generate_po(output_path, pages=1, lines_per_page=20, seed=0, terms_pages=0):
+    po = make_po(pages, lines_per_page, seed, terms_pages)
+    write_po_pdf(po, output_path)
+    return po
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    lines_per_page = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    terms_pages = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    po = generate_po(sys.argv[1], pages, lines_per_page, terms_pages=terms_pages)
+    print(f"📄 {sys.argv[1]}: {pages + terms_pages} pages, {len(po['lines'])} lines, MPO-NO {po['mpo_no']}")
@@ -0,0 +1,79 @@
+import cProfile
+import hmac
+import json
+import os
+import pstats
+
+# On-demand profiling of single extractions (POST /jobs?profile=true,
+# POST /upload?profile=true), only for requests carrying this token in
+# PROFILE_TOKEN_HEADER. Unset disables profiling entirely.
+PROFILE_TOKEN = os.environ.get("UNICO_PROFILE_TOKEN", "")
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+
+# Profiles live outside outputs/ so /download never serves them
+PROFILE_DIR = os.environ.get("UNICO_PROFILE_DIR", "profiles")
+
+# Functions listed in the JSON report, by cumulative and by own time
+TOP_FUNCTIONS = 40
+
+
+def profiling_enabled():
+    return bool(PROFILE_TOKEN)
+
+
+def profiling_allowed(token):
+    return profiling_enabled() and bool(token) and hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+def profile_paths(profile_dir, job_id):
+    # (cProfile dump for pstats/snakeviz, JSON report)
+    base = os.path.join(profile_dir, job_id)
+    return f"{base}.prof", f"{base}.json"
+
+
+class ExtractionProfiler:
+    # cProfile around one extraction plus the per-page timings the
+    # extractor records when stats["page_timings"] is present
+
+    def __init__(self, profile_path, report_path):
+        self.profile_path = profile_path
+        self.report_path = report_path
+        self.profiler = cProfile.Profile()
+
+    def start(self, stats):
+        stats["page_timings"] = []
+        self.profiler.enable()
+
+    def stop(self, stats, error=None):
+        self.profiler.disable()
+        self.profiler.dump_stats(self.profile_path)
+        report = build_report(pstats.Stats(self.profile_path), stats, error)
+        with open(self.report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return report
+
+
+def build_report(profile_stats, stats, error=None):
+    pages = stats.get("page_timings", [])
+    functions = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in profile_stats.stats.items():
+        functions.append({
+            "function": f"{os.path.basename(filename)}:{line}({name})" if line else name,
+            "calls": calls,
+            "total_seconds": round(total, 4),
+            "cumulative_seconds": round(cumulative, 4),
+        })
+    by_cumulative = sorted(functions, key=lambda function: function["cumulative_seconds"], reverse=True)
+    # Own time excludes callees: where the CPU actually went
+    by_own_time = sorted(functions, key=lambda function: function["total_seconds"], reverse=True)
+    return {
+        "error": error,
+        "pages": stats.get("pages"),
+        "rows": stats.get("rows"),
+        "total_seconds": round(profile_stats.total_tt, 4),
+        "stages": {stage: round(seconds, 4) for stage, seconds in stats.get("timings", {}).items()},
+        "slowest_pages": sorted(pages, key=lambda page: page["seconds"], reverse=True)[:10],
+        "page_timings": pages,
+        "functions": by_cumulative[:TOP_FUNCTIONS],
+        "hot_functions": by_own_time[:TOP_FUNCTIONS],
+    }
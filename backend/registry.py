@@ -0,0 +1,236 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+# Shared state for every API worker process on the host: jobs, output
+# artifacts, the result cache index, janitor holds and leases. SQLite in WAL
+# mode lets the workers read concurrently while one of them writes.
+REGISTRY_PATH = os.environ.get("UNICO_REGISTRY_PATH", "")
+
+# Holds older than this are treated as left over by a crashed worker
+HOLD_MAX_SECONDS = float(os.environ.get("UNICO_HOLD_MAX_SECONDS", "3600"))
+
+# Finished jobs and removed artifacts are forgotten after this long (the
+# janitor prunes them; downloads of older removed files answer 404, not 410)
+RECORD_MAX_AGE_SECONDS = float(os.environ.get("UNICO_REGISTRY_RETENTION_HOURS", "720")) * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    source_filename TEXT,
+    source_hash TEXT,
+    source_bytes INTEGER,
+    output_filename TEXT,
+    items_count INTEGER,
+    error TEXT,
+    cached INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    stats TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_source_hash ON jobs (source_hash);
+CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at);
+
+CREATE TABLE IF NOT EXISTS artifacts (
+    filename TEXT PRIMARY KEY,
+    job_id TEXT,
+    source_hash TEXT,
+    size INTEGER,
+    worker TEXT,
+    created_at REAL,
+    removed_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    items_count INTEGER,
+    size INTEGER,
+    created_at REAL,
+    last_access REAL
+);
+CREATE INDEX IF NOT EXISTS cache_entries_last_access ON cache_entries (last_access);
+
+CREATE TABLE IF NOT EXISTS holds (
+    path TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS holds_path ON holds (path);
+
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL
+);
+"""
+
+
+def worker_id():
+    # Identifies the API worker that recorded a row
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Registry:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        # One connection per thread (and per process: connections are
+        # never shared across a fork)
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def transaction(self):
+        return _Transaction(self.connection())
+
+    # Jobs
+
+    def record_job(self, job_id, source_name, source_hash, source_bytes, output_path, created_at, cached=False):
+        self.connection().execute(
+            "INSERT OR REPLACE INTO jobs (id, status, source_filename, source_hash, source_bytes,"
+            " output_filename, cached, worker, created_at) VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, source_name, source_hash, source_bytes, os.path.basename(output_path),
+             int(cached), worker_id(), created_at),
+        )
+
+    def start_job(self, job_id, started_at):
+        # Called from the pool process running the job; a job that already
+        # finished (or was never recorded) is left alone
+        self.connection().execute(
+            "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+            (started_at, job_id),
+        )
+
+    def finish_job(self, job_id, status, result=None, error=None, finished_at=None):
+        result = result or {}
+        self.connection().execute(
+            # A failed job has no result; keep the start the worker recorded
+            "UPDATE jobs SET status = ?, items_count = ?, error = ?, started_at = COALESCE(?, started_at),"
+            " finished_at = ?, stats = ? WHERE id = ?",
+            (status, result.get("items_count"), error, result.get("started_at"),
+             result.get("finished_at", finished_at), json.dumps(result.get("stats", {})), job_id),
+        )
+
+    def get_job(self, job_id):
+        row = self.connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["cached"] = bool(job["cached"])
+        job["stats"] = json.loads(job["stats"]) if job["stats"] else {}
+        return job
+
+    # Artifacts
+
+    def record_artifact(self, output_path, job_id=None, source_hash=None):
+        self.connection().execute(
+            "INSERT OR REPLACE INTO artifacts (filename, job_id, source_hash, size, worker, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (os.path.basename(output_path), job_id, source_hash, os.path.getsize(output_path),
+             worker_id(), time.time()),
+        )
+
+    def mark_removed(self, filename):
+        # Artifacts the app never registered (e.g. from an older version)
+        # are recorded too, so downloads can still answer 410
+        self.connection().execute(
+            "INSERT INTO artifacts (filename, removed_at) VALUES (?, ?)"
+            " ON CONFLICT (filename) DO UPDATE SET removed_at = excluded.removed_at",
+            (filename, time.time()),
+        )
+
+    def artifact(self, filename):
+        row = self.connection().execute("SELECT * FROM artifacts WHERE filename = ?", (filename,)).fetchone()
+        return dict(row) if row is not None else None
+
+    # Holds: files in use by some worker, kept away from the janitor
+
+    def hold(self, path):
+        self.connection().execute(
+            "INSERT INTO holds (path, owner, created_at) VALUES (?, ?, ?)",
+            (os.path.abspath(path), worker_id(), time.time()),
+        )
+
+    def release(self, path):
+        self.connection().execute(
+            "DELETE FROM holds WHERE rowid = (SELECT rowid FROM holds WHERE path = ? AND owner = ? LIMIT 1)",
+            (os.path.abspath(path), worker_id()),
+        )
+
+    def is_held(self, path):
+        row = self.connection().execute(
+            "SELECT 1 FROM holds WHERE path = ? AND created_at > ? LIMIT 1",
+            (os.path.abspath(path), time.time() - HOLD_MAX_SECONDS),
+        ).fetchone()
+        return row is not None
+
+    def held_count(self):
+        return self.connection().execute(
+            "SELECT COUNT(*) FROM holds WHERE created_at > ?", (time.time() - HOLD_MAX_SECONDS,)
+        ).fetchone()[0]
+
+    def prune(self, max_age_seconds=RECORD_MAX_AGE_SECONDS):
+        # Drops old finished jobs, removed artifacts and expired holds;
+        # returns the number of rows deleted per table
+        now = time.time()
+        cutoff = now - max_age_seconds
+        with self.transaction() as db:
+            return {
+                "jobs": db.execute(
+                    "DELETE FROM jobs WHERE COALESCE(finished_at, created_at) < ?"
+                    " AND status IN ('done', 'failed')", (cutoff,)
+                ).rowcount,
+                "artifacts": db.execute(
+                    "DELETE FROM artifacts WHERE removed_at IS NOT NULL AND removed_at < ?", (cutoff,)
+                ).rowcount,
+                "holds": db.execute(
+                    "DELETE FROM holds WHERE created_at < ?", (now - HOLD_MAX_SECONDS,)
+                ).rowcount,
+            }
+
+    # Leases: one worker at a time runs host-wide maintenance
+
+    def acquire_lease(self, name, ttl_seconds):
+        now = time.time()
+        owner = worker_id()
+        with self.transaction() as db:
+            row = db.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row is not None and row["owner"] != owner and row["expires_at"] > now:
+                return False
+            db.execute(
+                "INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                (name, owner, now + ttl_seconds),
+            )
+        return True
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front so read-modify-write
+    # sequences from different workers can't interleave
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        return False
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Import-time report for the API process
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and
+reports the total and the slowest modules, so import cost can be tracked
+across releases. Fails if a heavy module (pdfplumber, pdfminer, openpyxl,
+pandas) is loaded at import: those belong to the first request in a worker.
+
+Usage:
+  python startup_report.py                 # top 15 modules
+  python startup_report.py --top 30 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ["pdfplumber", "pdfminer", "openpyxl", "pandas"]
+
+
+def measure_imports(module="main"):
+    # Returns ([(module, self_us, cumulative_us)], wall seconds). Runs from
+    # the backend directory, like the server (main uses relative paths).
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=backend_dir)
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=backend_dir, env=env, capture_output=True, text=True,
+    )
+    wall_seconds = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules, wall_seconds
+
+
+def build_report(module, top):
+    modules, wall_seconds = measure_imports(module)
+    target = next((entry for entry in modules if entry[0] == module), None)
+    loaded = {name for name, _, _ in modules}
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "module": module,
+        "import_seconds": round(target[2] / 1e6, 3) if target else None,
+        "interpreter_seconds": round(wall_seconds, 3),
+        "modules_loaded": len(modules),
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in loaded],
+        "slowest": [
+            {"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cumulative_us / 1000, 1)}
+            for name, self_us, cumulative_us in sorted(modules, key=lambda entry: entry[1], reverse=True)[:top]
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list (by self time)")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = build_report(args.module, args.top)
+    print(f"⏱  import {report['module']}: {report['import_seconds']}s "
+          f"({report['modules_loaded']} modules, interpreter total {report['interpreter_seconds']}s)")
+    print(f"{'module':50} {'self ms':>9} {'cum ms':>9}")
+    for entry in report["slowest"]:
+        print(f"{entry['module']:50} {entry['self_ms']:>9} {entry['cumulative_ms']:>9}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if report["heavy_modules_loaded"]:
+        print(f"❌ Loaded at import: {', '.join(report['heavy_modules_loaded'])}")
+        sys.exit(1)
+    print("✅ No heavy modules loaded at import")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Check that page triage never drops an order line
+
+Every PDF is extracted twice: with triage in strict mode, where pages the
+triage would skip are still fully extracted and any order line found on
+them is reported as a miss, and with triage off. The order lines of both
+runs must be identical. Covers docs/samples plus synthetic POs with terms
+pages; exits 1 on any miss or difference.
+
+Usage:
+  python triage_check.py                       # samples + synthetic POs
+  python triage_check.py orders/*.pdf --no-samples --no-synthetic
+  python triage_check.py --json triage.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+from extractor import UnicoExtractor
+from layout import LayoutProfileStore
+from po_generator import generate_po
+
+SAMPLES_GLOB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docs", "samples", "*.pdf")
+
+# (pages, lines per page, terms pages) of the synthetic POs
+SYNTHETIC_POS = [(1, 20, 1), (5, 25, 2), (20, 28, 3)]
+
+
+def extract(pdf_path, triage):
+    # Fresh layout profiles per run, so both runs detect tables the same way
+    extractor = UnicoExtractor(page_triage=triage, layouts=LayoutProfileStore(""))
+    stats = {}
+    started = time.perf_counter()
+    _, lines = extractor.extract_lines(pdf_path, stats)
+    return lines, stats, time.perf_counter() - started
+
+
+def check_pdf(pdf_path):
+    strict_lines, stats, strict_seconds = extract(pdf_path, "strict")
+    off_lines, _, off_seconds = extract(pdf_path, "off")
+    _, _, on_seconds = extract(pdf_path, "on")
+    misses = stats.get("triage_misses", [])
+    return {
+        "pdf": pdf_path,
+        "pages": stats.get("pages", 0),
+        "lines": len(off_lines),
+        "skipped_pages": stats.get("skipped_pages", []),
+        "triage_misses": misses,
+        "same_lines": strict_lines == off_lines,
+        "ok": not misses and strict_lines == off_lines,
+        "seconds": {"off": round(off_seconds, 3), "on": round(on_seconds, 3)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", help="extra PDFs to check")
+    parser.add_argument("--no-samples", dest="samples", action="store_false", help="skip docs/samples PDFs")
+    parser.add_argument("--no-synthetic", dest="synthetic", action="store_false",
+                        help="skip generated POs with terms pages")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="unico-triage-") as work_dir:
+        pdf_paths = list(args.pdfs)
+        if args.samples:
+            pdf_paths.extend(sorted(glob.glob(SAMPLES_GLOB)))
+        if args.synthetic:
+            for pages, lines_per_page, terms_pages in SYNTHETIC_POS:
+                pdf_path = os.path.join(work_dir, f"synthetic_{pages}p_{terms_pages}t.pdf")
+                generate_po(pdf_path, pages, lines_per_page, seed=pages, terms_pages=terms_pages)
+                pdf_paths.append(pdf_path)
+        if not pdf_paths:
+            sys.exit("No PDFs to check")
+
+        results = []
+        for pdf_path in pdf_paths:
+            result = check_pdf(pdf_path)
+            results.append(result)
+            mark = "✅" if result["ok"] else "❌"
+            print(f"{mark} {os.path.basename(pdf_path)}: {result['lines']} lines, "
+                  f"{len(result['skipped_pages'])}/{result['pages']} pages skipped, "
+                  f"⏱ {result['seconds']['off']:.2f}s -> {result['seconds']['on']:.2f}s")
+            if result["triage_misses"]:
+                print(f"    order lines on skipped pages: {result['triage_misses']}")
+            if not result["same_lines"]:
+                print("    order lines differ from extraction without triage")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": results,
+            }, f, indent=2, ensure_ascii=False)
+
+    failed = [result for result in results if not result["ok"]]
+    if failed:
+        print(f"❌ Triage dropped order lines in {len(failed)} of {len(results)} PDFs")
+        sys.exit(1)
+    print(f"✅ Triage kept every order line in {len(results)} PDFs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Compare generated workbooks against golden workbooks
+
+Both files are streamed with openpyxl's read-only mode. The check covers
+sheet title, column widths, and every cell's value and style (font, fill,
+border, alignment, number format). It stops at the first --max-diffs
+differences. Given two directories, each golden *.xlsx is compared with
+the output of the same name, in parallel worker processes. Exits 1 on
+any difference or missing output.
+
+Workbooks whose worksheet, styles and shared strings are byte-identical
+(zip CRCs) skip the cell-by-cell pass, so checking thousands of outputs
+of an unchanged writer takes seconds.
+
+Usage:
+  python verify_outputs.py outputs/result.xlsx golden.xlsx
+  python verify_outputs.py outputs/ goldens/ --jobs 8 --json verify.json
+  python verify_outputs.py out.xlsx hand_made.xlsx --columns 27 --values-only --ignore-title
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import zip_longest
+from xml.etree.ElementTree import iterparse
+
+import openpyxl
+
+STYLE_ATTRS = ["font", "fill", "border", "alignment", "number_format"]
+SPREADSHEETML = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def column_widths(path, worksheet_path):
+    # <cols> of the worksheet XML, read up to <sheetData> only (read-only
+    # worksheets don't expose column dimensions)
+    widths = {}
+    with zipfile.ZipFile(path) as package, package.open(worksheet_path) as sheet:
+        for _, element in iterparse(sheet, events=("start",)):
+            if element.tag == f"{SPREADSHEETML}sheetData":
+                break
+            if element.tag == f"{SPREADSHEETML}col" and element.get("width") is not None:
+                for col_idx in range(int(element.get("min")), int(element.get("max")) + 1):
+                    widths[col_idx] = round(float(element.get("width")), 2)
+    return widths
+
+
+def same_parts(actual_path, expected_path, actual_sheet, expected_sheet):
+    # Byte-identical worksheet, styles and shared strings (CRC and size
+    # from the zip directories, nothing decompressed): nothing to compare
+    # cell by cell. Outputs of an unchanged writer take this path.
+    with zipfile.ZipFile(actual_path) as actual, zipfile.ZipFile(expected_path) as expected:
+        pairs = [(actual_sheet, expected_sheet), ("xl/styles.xml", "xl/styles.xml"),
+                 ("xl/sharedStrings.xml", "xl/sharedStrings.xml")]
+        for actual_part, expected_part in pairs:
+            actual_info = _zip_info(actual, actual_part)
+            expected_info = _zip_info(expected, expected_part)
+            if actual_info is None and expected_info is None:
+                continue
+            if actual_info is None or expected_info is None:
+                return False
+            if (actual_info.CRC, actual_info.file_size) != (expected_info.CRC, expected_info.file_size):
+                return False
+    return True
+
+
+def _zip_info(package, name):
+    try:
+        return package.getinfo(name)
+    except KeyError:
+        return None
+
+
+def _style_key(cell):
+    # Cells sharing a style id share every style attribute; EmptyCell
+    # (missing in the file) has none
+    return getattr(cell, "_style_id", None)
+
+
+def _style_diffs(expected_cell, actual_cell):
+    return [
+        attr for attr in STYLE_ATTRS
+        if getattr(expected_cell, attr, None) != getattr(actual_cell, attr, None)
+    ]
+
+
+def compare_workbooks(actual_path, expected_path, max_diffs=20, columns=None, values_only=False,
+                      ignore_title=False):
+    # Returns (differences, rows compared); differences are strings,
+    # at most max_diffs of them
+    diffs = []
+    expected_wb = openpyxl.load_workbook(expected_path, read_only=True)
+    actual_wb = openpyxl.load_workbook(actual_path, read_only=True)
+    try:
+        expected_ws = expected_wb.active
+        actual_ws = actual_wb.active
+
+        if not ignore_title and expected_ws.title != actual_ws.title:
+            diffs.append(f"sheet title: {actual_ws.title!r} != {expected_ws.title!r}")
+        if same_parts(actual_path, expected_path, actual_ws._worksheet_path, expected_ws._worksheet_path):
+            return diffs, expected_ws.max_row or 0
+
+        if not values_only:
+            expected_widths = column_widths(expected_path, expected_ws._worksheet_path)
+            actual_widths = column_widths(actual_path, actual_ws._worksheet_path)
+            for col_idx in sorted(set(expected_widths) | set(actual_widths)):
+                if columns and col_idx > columns:
+                    continue
+                if expected_widths.get(col_idx) != actual_widths.get(col_idx):
+                    letter = openpyxl.utils.get_column_letter(col_idx)
+                    diffs.append(f"width {letter}: {actual_widths.get(col_idx)} != {expected_widths.get(col_idx)}")
+
+        # Style comparisons are cached per (expected, actual) style id pair,
+        # so a large output costs one lookup per cell after the first row
+        style_cache = {}
+        rows = 0
+        for row_idx, (expected_row, actual_row) in enumerate(
+            zip_longest(expected_ws.iter_rows(max_col=columns), actual_ws.iter_rows(max_col=columns)), 1
+        ):
+            rows = row_idx
+            if expected_row is None or actual_row is None:
+                diffs.append(f"row {row_idx}: {'extra' if expected_row is None else 'missing'} row")
+                if len(diffs) >= max_diffs:
+                    break
+                continue
+            for col_idx, (expected_cell, actual_cell) in enumerate(zip_longest(expected_row, actual_row), 1):
+                expected_value = getattr(expected_cell, "value", None)
+                actual_value = getattr(actual_cell, "value", None)
+                styles = ()
+                if not values_only:
+                    key = (_style_key(expected_cell), _style_key(actual_cell))
+                    styles = style_cache.get(key)
+                    if styles is None:
+                        styles = style_cache[key] = _style_diffs(expected_cell, actual_cell)
+                if expected_value == actual_value and not styles:
+                    continue
+                coordinate = f"{openpyxl.utils.get_column_letter(col_idx)}{row_idx}"
+                if expected_value != actual_value:
+                    diffs.append(f"{coordinate} value: {actual_value!r} != {expected_value!r}")
+                for attr in styles:
+                    diffs.append(f"{coordinate} {attr} differs")
+                if len(diffs) >= max_diffs:
+                    return diffs[:max_diffs], rows
+        return diffs[:max_diffs], rows
+    finally:
+        expected_wb.close()
+        actual_wb.close()
+
+
+def verify_pair(actual_path, expected_path, options):
+    started = time.perf_counter()
+    result = {"actual": actual_path, "expected": expected_path}
+    if not os.path.exists(actual_path):
+        result.update(ok=False, rows=0, diffs=["missing output"])
+    else:
+        try:
+            diffs, rows = compare_workbooks(actual_path, expected_path, **options)
+            result.update(ok=not diffs, rows=rows, diffs=diffs)
+        except Exception as e:
+            result.update(ok=False, rows=0, diffs=[f"unreadable: {type(e).__name__}: {e}"])
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _verify_pair_args(args):
+    return verify_pair(*args)
+
+
+def build_pairs(actual, expected):
+    # (actual, golden) paths; directories pair up by file name
+    if os.path.isdir(expected):
+        return [
+            (os.path.join(actual, os.path.basename(golden)), golden)
+            for golden in sorted(glob.glob(os.path.join(expected, "*.xlsx")))
+        ]
+    return [(actual, expected)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("actual", help="generated workbook, or directory of them")
+    parser.add_argument("expected", help="golden workbook, or directory of them")
+    parser.add_argument("--max-diffs", type=int, default=20, help="differences reported per workbook")
+    parser.add_argument("--columns", type=int, help="compare only the first N columns")
+    parser.add_argument("--values-only", action="store_true", help="skip styles and column widths")
+    parser.add_argument("--ignore-title", action="store_true", help="don't compare sheet titles")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="parallel worker processes")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    pairs = build_pairs(args.actual, args.expected)
+    if not pairs:
+        sys.exit(f"No golden workbooks in {args.expected}")
+    options = {
+        "max_diffs": args.max_diffs,
+        "columns": args.columns,
+        "values_only": args.values_only,
+        "ignore_title": args.ignore_title,
+    }
+
+    started = time.perf_counter()
+    tasks = [(actual, expected, options) for actual, expected in pairs]
+    if args.jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(tasks))) as executor:
+            results = list(executor.map(_verify_pair_args, tasks, chunksize=max(1, len(tasks) // (args.jobs * 4))))
+    else:
+        results = [verify_pair(*task) for task in tasks]
+    elapsed = time.perf_counter() - started
+
+    failed = [result for result in results if not result["ok"]]
+    for result in failed:
+        print(f"❌ {result['actual']} vs {result['expected']}")
+        for diff in result["diffs"]:
+            print(f"    {diff}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "workbooks": len(results),
+                "failed": len(failed),
+                "seconds": round(elapsed, 3),
+                "results": results,
+            }, f, indent=2, ensure_ascii=False)
+
+    rows = sum(result["rows"] for result in results)
+    summary = f"{len(results)} workbooks, {rows} rows in {elapsed:.2f}s"
+    if failed:
+        print(f"❌ {len(failed)} of {summary} differ")
+        sys.exit(1)
+    print(f"✅ {summary} match")
+
+
+if __name__ == "__main__":
+    main()
@@ -91,10 +91,11 @@ async function extractData() {
     formData.append('request', extractionRequest.value.trim());
 
     try {
-        updateProgress(10);
+        updateProgress(5);
         addLog('info', '📤 Đang gửi yêu cầu lên server...');
         
-        const response = await fetch(`${API_URL}/upload`, {
+        // Server-sent events: progress per page instead of one blocking call
+        const response = await fetch(`${API_URL}/upload/stream`, {
             method: 'POST',
             body: formData
         });
@@ -104,19 +105,46 @@ async function extractData() {
             throw new Error(errorData.detail || 'Xử lý thất bại');
         }
 
-        updateProgress(50);
         addLog('success', '✓ Server đã nhận file và đang xử lý...');
         
-        const data = await response.json();
+        let columns = [];
+        const previewRows = [];
+        let data = null;
         
-        updateProgress(80);
+        await readEvents(response, (event, payload) => {
+            if (event === 'start') {
+                columns = payload.columns;
+                addLog('info', `📄 PO ${payload.header.mpo_no || ''}: ${payload.pages} trang`);
+            } else if (event === 'page') {
+                updateProgress(5 + Math.round(85 * payload.page / payload.pages));
+                addLog('info', `🔍 Trang ${payload.page}/${payload.pages}: ${payload.rows.length} dòng`);
+                payload.rows.forEach(row => {
+                    if (previewRows.length < 10) {
+                        previewRows.push(Object.fromEntries(columns.map((name, i) => [name, row[i]])));
+                    }
+                });
+            } else if (event === 'done') {
+                data = payload;
+            } else if (event === 'error') {
+                throw new Error(payload.detail);
+            }
+        });
+        
+        if (!data) {
+            throw new Error('Kết nối bị gián đoạn');
+        }
+        
+        updateProgress(95);
         addLog('info', `🔍 Đã trích xuất ${data.items_count} dòng dữ liệu.`);
+        if (data.cached) {
+            addLog('info', '⚡ File này đã được xử lý trước đó, dùng lại kết quả.');
+        }
         
         // Setup download
-        downloadUrl = `${API_URL}/download/${data.filename}`;
+        downloadUrl = `${API_URL}${data.download_url}`;
         
         // Show preview
-        displayPreview(data.preview_data || []);
+        displayPreview(previewRows);
         
         updateProgress(100);
         addLog('success', '🎉 Hoàn tất! Bạn có thể xem trước kết quả bên dưới.');
@@ -132,6 +160,35 @@ async function extractData() {
     }
 }
 
+// Parse a text/event-stream response body, calling onEvent(event, data)
+async function readEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const message = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let dataLines = [];
+            message.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+            });
+            if (dataLines.length > 0) {
+                onEvent(event, JSON.parse(dataLines.join('\n')));
+            }
+        }
+    }
+}
+
 // Display Preview Table
 function displayPreview(previewData) {
     const tableHeader = document.getElementById('tableHeader');